@@ -1,7 +1,7 @@
 import streamlit as st
 from sidebar import menu
-from utils.services import get_client, get_raw_values, get_clean_database
-from utils.format import cast_to_number
+from utils.services import get_client, get_spreadsheet, get_database, get_clean_database
+from utils.quota import get_request_stats
 
 
 # ====== Konfigurasi Homepage ======
@@ -31,8 +31,6 @@ database_sheet_name = "DATABASE"
 if st.button("✅ Simpan Link", type="primary") and link:
     st.session_state["database_gsheet_url"] = link
     st.session_state["database_sheet_name"] = database_sheet_name
-    st.session_state.pop("df_database", None)         # reset agar data di-reload
-    st.session_state.pop("df_database_clean", None)   # reset hasil filter
 
 # ====== Kalau link database sudah ada ======
 if st.session_state.get("database_gsheet_url"):
@@ -42,29 +40,25 @@ if st.session_state.get("database_gsheet_url"):
     if "client" not in st.session_state:
         st.session_state["client"] = get_client()
 
-    # Inisialisasi database
-    if "df_database" not in st.session_state:
-        df = get_raw_values(
-            st.session_state["database_gsheet_url"],
-            st.session_state["database_sheet_name"]
-        )
-        df = cast_to_number(df)
-        st.session_state["df_database"] = df
-
-    # Get database raw dan bersih
-    df_database = st.session_state["df_database"]
+    # Get database raw dan bersih (frame bersama semua session, kolom sudah bertipe)
+    df_database = get_database(
+        st.session_state["database_gsheet_url"],
+        st.session_state["database_sheet_name"]
+    )
     df_database_clean = get_clean_database()
 
-    # Ambil judul sheet
-    sh_title = st.session_state["client"].open_by_url(
-        st.session_state["database_gsheet_url"]
-    ).title
+    # Ambil judul sheet (handle spreadsheet dari cache)
+    sh_title = get_spreadsheet(st.session_state["database_gsheet_url"]).title
 
     st.info(
         f"📄 Database aktif di GSheet: [**{sh_title}**]({st.session_state['database_gsheet_url']}) "
         f"dengan sheet: {st.session_state['database_sheet_name']}"
     )
 
+    # Statistik pemakaian kuota Google Sheets (bersama untuk semua session)
+    with st.expander("📊 Statistik Request Google Sheets"):
+        st.json(get_request_stats())
+
     # Show sidebar menu
     menu()
 
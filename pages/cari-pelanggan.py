@@ -0,0 +1,53 @@
+import streamlit as st
+from utils.services import get_database, is_database_available
+from utils.pencarian import get_indeks_pelanggan, riwayat_pelanggan
+from utils.ui import tampilkan_riwayat
+from sidebar import menu
+
+
+# ===============================
+# Konfigurasi Halaman
+# ===============================
+st.set_page_config(page_title="Cari Pelanggan", layout="wide", page_icon="🔎")
+st.title("🔎 Cari Pelanggan")
+
+if not is_database_available():
+    st.page_link("home.py", label="Home", icon="🏠")
+    st.stop()
+menu()
+
+# Indeks dibangun sekali per versi data, jadi setiap pencarian hanya lookup
+df = get_database()
+indeks = get_indeks_pelanggan(df)
+
+
+# ===============================
+# Main App
+# ===============================
+kata_kunci = st.text_input(
+    "Cari IdNumber, BP Name, atau AM",
+    placeholder="mis. 1234567, nama pelanggan, atau nama AM",
+)
+if not kata_kunci:
+    st.caption("Ketik kata kunci lalu tekan Enter. Salah ketik kecil tetap ditemukan.")
+    st.stop()
+
+hasil = indeks.cari(kata_kunci)
+if hasil.empty:
+    st.info("Tidak ada pelanggan yang cocok.")
+    st.stop()
+
+st.caption("Klik salah satu baris untuk melihat data pelanggan tersebut.")
+pilihan = st.dataframe(
+    hasil,
+    use_container_width=True,
+    hide_index=True,
+    on_select="rerun",
+    selection_mode="single-row",
+    key=f"hasil_cari_{kata_kunci}",
+)
+
+if pilihan.selection.rows:
+    pelanggan = hasil.iloc[pilihan.selection.rows[0]]
+    st.subheader(f"{pelanggan['BP Name']} ({pelanggan['IdNumber']})")
+    tampilkan_riwayat(riwayat_pelanggan(df, pelanggan["IdNumber"]))
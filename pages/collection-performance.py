@@ -1,21 +1,20 @@
 import streamlit as st
 import plotly.express as px
-import plotly.graph_objects as go
 from sidebar import menu
-from utils.services import get_raw_values, is_database_available
+from utils.services import get_many_values, is_database_linked
 from utils.format import cast_to_number
+from utils.charts import collection_performance_chart
 
 
 
 st.set_page_config(page_title="Collection Performance - Dashboard Data Collection", layout="wide", page_icon="📈")
 st.title("📊 Collection Performance")
 
-# Pastikan link ada di session_state
-is_database_available()
+# Pastikan link ada di session_state (halaman ini tidak membaca worksheet DATABASE)
+is_database_linked()
 menu()
 
-def get_data_collection(link_data, sheet_name):
-    df = get_raw_values(link_data, sheet_name)
+def get_data_collection(df):
     df["DGS"] = cast_to_number(df["DGS"])
     df["DPS"] = cast_to_number(df["DPS"])
     df["DSS"] = cast_to_number(df["DSS"])
@@ -41,8 +40,6 @@ def get_data_collection(link_data, sheet_name):
 
 #     st.plotly_chart(fig, use_container_width=False)
 
-import plotly.graph_objects as go
-
 # Definisikan warna manual per segmen
 segmen_colors = {
     "DGS": "#89C4E9",
@@ -52,51 +49,19 @@ segmen_colors = {
 }
 
 def plot_collection_performance(df, title):
-    df_long = df.melt(id_vars="BULAN", var_name="Segmen", value_name="Persentase")
-
-    fig = go.Figure()
-
-    # Tambahkan Rata-rata sebagai area abu-abu
-    df_avg = df_long[df_long["Segmen"] == "Rata-rata"]
-    fig.add_trace(
-        go.Scatter(
-            x=df_avg["BULAN"],
-            y=df_avg["Persentase"],
-            mode="lines",
-            name="Rata-rata",
-            line=dict(color="#fde8bd", width=2, dash="dot"), 
-            fill="tozeroy",
-            fillcolor="rgba(253,240,213,0.3)" 
-        )
-    )
-
-    # Tambahkan segmen 
-    for segmen in df_long["Segmen"].unique():
-        if segmen == "Rata-rata":
-            continue
-        df_seg = df_long[df_long["Segmen"] == segmen]
-        fig.add_trace(
-            go.Scatter(
-                x=df_seg["BULAN"],
-                y=df_seg["Persentase"],
-                mode="lines+markers",
-                name=segmen,
-                line=dict(color=segmen_colors.get(segmen, None))  # warna sesuai mapping
-            )
-        )
-
-    fig.update_layout(
-        title=f"Collection Performance {title}",
-        yaxis=dict(ticksuffix="%"),
-        legend=dict(title="Segmen")
-    )
-
+    # Figure di-cache per isi data & warna (lihat utils.charts)
+    fig = collection_performance_chart(df, title, segmen_colors)
     st.plotly_chart(fig, use_container_width=True)
 
 
 
-df_cr = get_data_collection(st.session_state["database_gsheet_url"], "DATA COLLECTION CR")
-df_cyc = get_data_collection(st.session_state["database_gsheet_url"], "DATA COLLECTION CYC")
+# Kedua sheet diambil dalam satu request
+df_cr, df_cyc = get_many_values(
+    ["DATA COLLECTION CR", "DATA COLLECTION CYC"],
+    st.session_state["database_gsheet_url"]
+)
+df_cr = get_data_collection(df_cr)
+df_cyc = get_data_collection(df_cyc)
 col1, col2 = st.columns(2)
 with col1:
     st.markdown("#### Collection Ratio (CR)")
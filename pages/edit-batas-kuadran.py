@@ -1,14 +1,16 @@
 import streamlit as st
 import pandas as pd
-from utils.google_utils import get_client
+from utils.services import get_worksheet, get_raw_values, get_database, invalidate_cache
 from utils.helpers import is_database_available
+from utils.format import get_tabel_batas_kuadran, reklasifikasi_kuadran, to_rupiah
+from utils.simulasi import get_simulator, SEMUA
 from sidebar import menu
 
 st.set_page_config(page_title="Modifikasi Batas Kuadran", layout="centered")
 st.title("📊 Modifikasi Batas Kuadran")
 
 
-is_database_available()
+database_tersedia = is_database_available()
 menu()
 
 st.warning("⚠️ Halaman ini masih dalam pengembangan. Sementara, batas kuadran ini.")
@@ -17,22 +19,7 @@ st.warning("⚠️ Halaman ini masih dalam pengembangan. Sementara, batas kuadra
 link_spreadsheet = st.session_state["database_gsheet_url"]
 nama_worksheet = "Batas Kuadran"
 
-client = get_client()
-ws = client.open_by_url(link_spreadsheet).worksheet(nama_worksheet)
-raw = ws.get_all_values()
-
-# --- Helper: format & konversi angka ---
-def to_number(series: pd.Series, allow_parentheses: bool = False) -> pd.Series:
-    s = series.astype(str).str.strip()
-    if allow_parentheses:
-        s = s.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
-    s = (
-        s.str.replace("Rp", "", regex=False)
-         .str.replace(".", "", regex=False)     
-         .str.replace(",", ".", regex=False)    
-         .str.replace(r"[^\d\.\-]", "", regex=True)
-    )
-    return pd.to_numeric(s, errors="coerce")
+df = get_raw_values(link_spreadsheet, nama_worksheet)
 
 # === DEFINISI DIALOG KONFIRMASI ===
 @st.dialog("Konfirmasi Upload Data")
@@ -41,7 +28,23 @@ def confirm_upload(df):
     st.write("Apakah Anda yakin ingin memperbarui data?")
     
     if st.button("Ya, Upload!"):
+        # Batas lama dibaca langsung dari sheet (tanpa cache), supaya edit langsung
+        # di sheet dalam rentang CACHE_TTL ikut terhitung
+        batas_lama = get_tabel_batas_kuadran(use_cache=False)
         replace_batas_kuadran(st.session_state["edited_df"])
+        batas_baru = get_tabel_batas_kuadran()
+
+        # Hitung ulang Kuadran seluruh periode, hanya untuk segmen yang batasnya berubah
+        segmen_berubah = [
+            seg for seg in batas_baru.index
+            if seg not in batas_lama.index or not batas_lama.loc[seg].equals(batas_baru.loc[seg])
+        ]
+        if segmen_berubah:
+            with st.spinner("Menghitung ulang kuadran..."):
+                jumlah = reklasifikasi_kuadran(segmen_berubah, batas=batas_baru)
+            st.session_state["pesan_reklasifikasi"] = (
+                f"🔁 Kuadran segmen {', '.join(segmen_berubah)} dihitung ulang: {jumlah} baris berubah."
+            )
         st.session_state["editing"] = False
         st.success(" ✅ Data berhasil diperbarui!")
         st.rerun()
@@ -51,7 +54,9 @@ def confirm_upload(df):
         st.rerun()
 
 def replace_batas_kuadran(df: pd.DataFrame):
+    ws = get_worksheet(link_spreadsheet, nama_worksheet, refresh=True)
     ws.update([df.columns.values.tolist()] + df.values.tolist())
+    invalidate_cache(link_spreadsheet, nama_worksheet)
 
 # ---------------- STATE ----------------
 if "editing" not in st.session_state:
@@ -59,9 +64,10 @@ if "editing" not in st.session_state:
 if "edited_df" not in st.session_state:
     st.session_state["edited_df"] = None
 
-df = pd.DataFrame(raw[1:], columns=raw[0])
-
 # ---------------- UI ----------------
+if "pesan_reklasifikasi" in st.session_state:
+    st.info(st.session_state.pop("pesan_reklasifikasi"))
+
 if not st.session_state["editing"]:
     st.dataframe(df)
     if st.button("✏️ Edit Data"):
@@ -74,3 +80,105 @@ else:
 
     if st.button("✅ Yakin Ganti"):
         confirm_upload(df)
+
+
+# ---------------- SIMULASI ----------------
+def tampilkan_simulasi():
+    """Slider batas kuadran + ringkasan per kuadran, tanpa menyimpan apa pun."""
+    st.divider()
+    st.subheader("🧪 Simulasi Batas Kuadran")
+    st.caption("Geser batas untuk melihat jumlah pelanggan & saldo per kuadran sebelum disimpan (Saldo Akhir > 0).")
+
+    if not database_tersedia:
+        st.info("Database belum dimuat.")
+        return
+
+    batas = get_tabel_batas_kuadran()
+    simulator = get_simulator(get_database())
+    daftar_segmen = [seg for seg in batas.index if seg in simulator.periode]
+    if not daftar_segmen:
+        st.info("Belum ada data untuk disimulasikan.")
+        return
+
+    col1, col2 = st.columns(2)
+    segmen = col1.selectbox("Segmen", daftar_segmen, key="sim_segmen")
+    bulan_tahun = col2.selectbox("Periode", [SEMUA] + simulator.periode[segmen], key="sim_periode")
+
+    nominal_sekarang, waktu_sekarang = batas.loc[segmen]
+    saldo_maks = max(simulator.saldo_maks[segmen], nominal_sekarang)
+    # Nilai awal slider = batas tersimpan (bisa diganti tombol "Pakai" di bagian saran)
+    st.session_state.setdefault(f"sim_nominal_{segmen}", float(nominal_sekarang))
+    st.session_state.setdefault(f"sim_waktu_{segmen}", float(waktu_sekarang))
+    batas_nominal = st.slider(
+        "Batas Nominal", 0.0, float(saldo_maks),
+        step=max(saldo_maks / 1000, 1.0), key=f"sim_nominal_{segmen}"
+    )
+    pilihan_waktu = sorted(set(simulator.lama_vals[segmen].tolist()) | {float(waktu_sekarang)})
+    batas_waktu = st.select_slider(
+        "Batas Waktu (bulan)", pilihan_waktu, key=f"sim_waktu_{segmen}"
+    )
+    st.write(f"Batas Nominal **{to_rupiah(batas_nominal)}**, Lama Tunggakan **{batas_waktu:.0f} bulan**")
+
+    hasil = simulator.hitung(segmen, batas_nominal, batas_waktu, bulan_tahun)
+    sekarang = simulator.hitung(segmen, nominal_sekarang, waktu_sekarang, bulan_tahun)
+
+    for kuadran, col in zip(hasil.index, st.columns(4)):
+        with col.container(border=True):
+            st.metric(
+                f"Kuadran {kuadran}",
+                hasil.loc[kuadran, "Jumlah Pelanggan"],
+                delta=int(hasil.loc[kuadran, "Jumlah Pelanggan"] - sekarang.loc[kuadran, "Jumlah Pelanggan"]),
+            )
+            st.caption(to_rupiah(hasil.loc[kuadran, "Total Saldo"]))
+
+
+tampilkan_simulasi()
+
+
+# ---------------- SARAN BATAS ----------------
+def pakai_saran(segmen, batas_nominal, batas_waktu):
+    """Salin saran ke slider simulasi (dipanggil sebelum halaman dirender ulang)."""
+    st.session_state["sim_segmen"] = segmen
+    st.session_state[f"sim_nominal_{segmen}"] = float(batas_nominal)
+    st.session_state[f"sim_waktu_{segmen}"] = float(batas_waktu)
+
+
+def tampilkan_saran():
+    """Sapu kandidat batas per segmen dan tampilkan pasangan yang paling dekat target."""
+    st.divider()
+    st.subheader("💡 Saran Batas Kuadran")
+
+    if not database_tersedia:
+        return
+    simulator = get_simulator(get_database())
+    daftar_segmen = [seg for seg in get_tabel_batas_kuadran().index if seg in simulator.periode]
+    if not daftar_segmen:
+        return
+
+    col1, col2 = st.columns(2)
+    segmen = col1.selectbox("Segmen", daftar_segmen, key="saran_segmen")
+    bulan_tahun = col2.selectbox("Periode", [SEMUA] + simulator.periode[segmen], key="saran_periode")
+    basis = st.radio("Dasar porsi", ["Total Saldo", "Jumlah Pelanggan"], horizontal=True)
+    target_besar = st.slider("Target porsi Kuadran 1+2 (nominal besar) %", 0, 100, 80)
+    target_lama = st.slider("Target porsi Kuadran 2+4 (tunggakan lama) %", 0, 100, 30)
+
+    saran = simulator.sarankan_batas(segmen, target_besar / 100, target_lama / 100, basis, bulan_tahun)
+    if saran.empty:
+        st.info("Tidak ada data untuk segmen ini.")
+        return
+
+    tampil = saran.copy()
+    tampil["Batas Nominal"] = tampil["Batas Nominal"].apply(to_rupiah)
+    for q in range(1, 5):
+        tampil[f"Kuadran {q}"] = (tampil[f"Kuadran {q}"] * 100).map("{:.1f}%".format)
+    st.dataframe(tampil.drop(columns="Selisih"), hide_index=True, use_container_width=True)
+
+    terbaik = saran.iloc[0]
+    st.button(
+        "➡️ Pakai saran teratas di simulasi",
+        on_click=pakai_saran,
+        args=(segmen, terbaik["Batas Nominal"], terbaik["Batas Waktu (bulan)"]),
+    )
+
+
+tampilkan_saran()
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from utils.google_utils import get_client
-from utils.helpers import is_database_available, pilih_kategori, to_rupiah, update_dataframe_kuadran_top_gsheet
+from utils.helpers import get_clean_database, is_database_available, pilih_kategori, to_rupiah, update_dataframe_kuadran_top_gsheet
 from sidebar import menu
 
 # ==============================
@@ -18,11 +18,6 @@ if "edit_mode" not in st.session_state:
     st.session_state.edit_mode = False
 if "edited_top3_all" not in st.session_state:
     st.session_state.edited_top3_all = {}
-if "df_database_clean" not in st.session_state:
-    # contoh dummy kalau belum ada data
-    st.session_state.df_database_clean = pd.DataFrame(
-        columns=["IdNumber", "Bulan Tahun", "Segmen", "BP Name", "Saldo Akhir", "Keterangan"]
-    )
 
 # ==============================
 # FUNGSI RENDER KUADRAN
@@ -41,7 +36,7 @@ def render_kuadran(dfq: pd.DataFrame, kuadran_num: int, judul: str):
         st.markdown(f"- Jumlah pelanggan: **{jml}**")
         st.markdown(f"- Total tunggakan: **{to_rupiah(total_nom)}**")
 
-        top3 = dfq.sort_values("Saldo Akhir", ascending=False).head(3)
+        top3 = dfq.sort_values("Saldo Akhir", ascending=False).head(3).reset_index(drop=True)
 
         if st.session_state.edit_mode:
             edited_top3 = st.data_editor(
@@ -73,22 +68,15 @@ else:
 
     if col_save.button("💾 Simpan Semua Perubahan", use_container_width=True):
         try:
-            # update session_state df pusat
-            for kuadran_num, df_ed in st.session_state.edited_top3_all.items():
-                for _, row in df_ed.iterrows():
-                    mask = (
-                        (st.session_state["df_database_clean"]["IdNumber"] == row["IdNumber"]) &
-                        (st.session_state["df_database_clean"]["Segmen"] == row["Segmen"]) &
-                        (st.session_state["df_database_clean"]["Bulan Tahun"] == row["Bulan Tahun"])
-                    )
-                    st.session_state["df_database_clean"].loc[mask, "Keterangan"] = row["Keterangan"]
-
-            # update ke spreadsheet
+            # update ke spreadsheet (semua kuadran sekaligus, satu batch_update);
+            # cache database dibuang, jadi render berikutnya membaca data terbaru
             client = st.session_state["client"] if "client" in st.session_state else get_client()
-            for _, df_ed in st.session_state.edited_top3_all.items():
-                update_dataframe_kuadran_top_gsheet(client=client, df_edited=df_ed)
+            update_dataframe_kuadran_top_gsheet(
+                client=client,
+                df_edited=pd.concat(st.session_state.edited_top3_all.values(), ignore_index=True)
+            )
 
-            st.toast("✅ Semua perubahan tersimpan di session & Google Sheet", icon="✅")
+            st.toast("✅ Semua perubahan tersimpan di Google Sheet", icon="✅")
             st.session_state.edit_mode = False  # keluar dari mode edit
             st.session_state.edited_top3_all = {}
         except Exception as e:
@@ -97,7 +85,11 @@ else:
 # ==============================
 # RENDER CONTOH KUADRAN
 # ==============================
-df = st.session_state.df_database_clean
+if not is_database_available():
+    st.page_link("home.py", label="Home", icon="🏠")
+    st.stop()
+
+df = get_clean_database()
 
 col1, col2 = st.columns(2)
 with col1:
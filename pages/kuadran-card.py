@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.google_utils import get_raw_values
-from utils.helpers import is_database_available, pilih_kategori, to_rupiah
-from utils.validation import to_number
+from utils.helpers import get_clean_database, is_database_available, pilih_kategori, to_rupiah
+from utils.schema import filter_periode
+from utils.kubus import get_kubus, ringkasan_kuadran
+from utils.peringkat import urutan_kuadran
+from utils.charts import pie_chart
 from sidebar import menu
 
 
@@ -20,46 +21,39 @@ if not is_database_available():
     st.page_link("home.py", label="Home", icon="🏠")
     st.stop()
 
-df = st.session_state["df_database_clean"]
+df = get_clean_database()
 
 # Sidebar menu
 menu()
 
-# ================================
-# Konversi kolom numeric
-# ================================
-aging_cols = ["0-3 Bulan", "4-6 Bulan", "7-12 Bulan", "13-24 Bulan", "> 24 Bulan"]
-df[aging_cols] = df[aging_cols].apply(lambda s: to_number(s, allow_parentheses=True))
-df["Saldo Akhir"] = to_number(df["Saldo Akhir"], allow_parentheses=False)
-df["Lama Tunggakan"] = to_number(df["Lama Tunggakan"], allow_parentheses=False)
-df["Kuadran"] = pd.to_numeric(df["Kuadran"], errors="coerce").astype("Int64")
-
 # ================================
 # Filter kategori (bulan, tahun, segmen)
 # ================================
 bulan_target, tahun_target, segmen_target = pilih_kategori()
-df_filtered = df.copy()
+df_filtered = filter_periode(df, bulan_target, tahun_target, segmen_target)
+urutan = urutan_kuadran(df_filtered, (bulan_target, tahun_target, segmen_target))
 
-if segmen_target != "-Semua-":
-    df_filtered = df_filtered[df_filtered["Segmen"] == segmen_target]
-else:
+# Angka ringkasan dibaca dari kubus agregat (lihat utils.kubus)
+ringkasan = ringkasan_kuadran(get_kubus(df), tahun_target, bulan_target, segmen_target)
+per_kuadran = ringkasan.loc[1:4]
+per_kuadran = per_kuadran[per_kuadran["Jumlah Baris"] > 0]
+
+if segmen_target == "-Semua-":
     segmen_target = "Semua Segmen"
 
 if bulan_target != 0:
     tanggal_target = f"{bulan_target}/{tahun_target}"
-    df_filtered = df_filtered[df_filtered["Bulan Tahun"] == tanggal_target]
 else:
-    df_filtered = df_filtered[df_filtered["Bulan Tahun"].str.split("/").str[1] == str(tahun_target)]
     tanggal_target = f"Semua Bulan {tahun_target}"
 
 # Hanya ambil pelanggan dengan saldo > 0
-df_filtered = df_filtered[df_filtered["Saldo Akhir"].astype(float) > 0]
+df_filtered = df_filtered[df_filtered["Saldo Akhir"] > 0]
 
 # ================================
 # Summary Total
 # ================================
-total_pelanggan = len(df_filtered)
-total_tunggakan = df_filtered["Saldo Akhir"].sum(skipna=True)
+total_pelanggan = int(ringkasan.loc[0, "Jumlah Baris"])
+total_tunggakan = ringkasan.loc[0, "Saldo Akhir"]
 
 st.markdown(f"### Ringkasan {segmen_target} — {tanggal_target}")
 
@@ -69,21 +63,10 @@ with col1:
     with st.container(border=True):
         st.metric("Total Pelanggan", total_pelanggan)
 
-        pie_data = (
-            df_filtered.groupby("Kuadran", dropna=True)["IdNumber"]
-            .count()
-            .reset_index(name="Jumlah Pelanggan")
-        )
+        pie_data = per_kuadran["Jumlah Baris"].reset_index(name="Jumlah Pelanggan")
         if not pie_data.empty:
             pie_data["Kuadran"] = pie_data["Kuadran"].apply(lambda q: f"Kuadran {q}")
-            fig = px.pie(
-                pie_data,
-                values="Jumlah Pelanggan",
-                names="Kuadran",
-                hole=0.3,
-                title="Proporsi Jumlah Pelanggan",
-                color="Kuadran",
-            )
+            fig = pie_chart(pie_data, "Jumlah Pelanggan", "Kuadran", "Proporsi Jumlah Pelanggan")
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Tidak ada data proporsi pelanggan.")
@@ -92,21 +75,10 @@ with col2:
     with st.container(border=True):
         st.metric("Total Tunggakan", to_rupiah(total_tunggakan))
 
-        pie_data = (
-            df_filtered.groupby("Kuadran", dropna=True)["Saldo Akhir"]
-            .sum()
-            .reset_index()
-        )
+        pie_data = per_kuadran["Saldo Akhir"].reset_index()
         if not pie_data.empty:
             pie_data["Kuadran"] = pie_data["Kuadran"].apply(lambda q: f"Kuadran {q}")
-            fig = px.pie(
-                pie_data,
-                values="Saldo Akhir",
-                names="Kuadran",
-                hole=0.3,
-                title="Proporsi Tunggakan",
-                color="Kuadran",
-            )
+            fig = pie_chart(pie_data, "Saldo Akhir", "Kuadran", "Proporsi Tunggakan")
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Tidak ada data proporsi tunggakan.")
@@ -114,17 +86,17 @@ with col2:
 # ================================
 # Komponen Kuadran
 # ================================
-def render_kuadran(dfq: pd.DataFrame, kuadran_num: int, judul: str):
+def render_kuadran(kuadran_num: int, judul: str):
     with st.container(border=True):
         st.subheader(judul)
 
-        if dfq.empty:
+        if len(urutan[kuadran_num]) == 0:
             st.info("Tidak ada data di kuadran ini.")
             return
 
-        jml = len(dfq)
+        jml = int(ringkasan.loc[kuadran_num, "Jumlah Baris"])
         persen_plg = (jml / total_pelanggan * 100) if total_pelanggan else 0.0
-        total_nom = dfq["Saldo Akhir"].sum(skipna=True)
+        total_nom = ringkasan.loc[kuadran_num, "Saldo Akhir"]
         persen_nom = (total_nom / total_tunggakan * 100) if total_tunggakan else 0.0
 
         st.markdown(
@@ -135,7 +107,7 @@ def render_kuadran(dfq: pd.DataFrame, kuadran_num: int, judul: str):
         # ================================
         # Top 3 by Saldo Akhir + editable
         # ================================
-        top3 = dfq.sort_values("Saldo Akhir", ascending=False).head(3).copy()
+        top3 = df_filtered.iloc[urutan[kuadran_num][:3]].reset_index(drop=True)
         top3["Saldo Akhir (Rp)"] = top3["Saldo Akhir"].apply(to_rupiah)
         top3["Keterangan"] = top3.get("Keterangan", pd.Series([""] * len(top3)))
 
@@ -162,12 +134,12 @@ st.markdown(f"### Detail Kuadran {segmen_target} — {tanggal_target}")
 
 c1, c2 = st.columns(2)
 with c1:
-    render_kuadran(df_filtered[df_filtered["Kuadran"] == 1], 1, "Kuadran 1 — Baru menunggak & nominal besar")
+    render_kuadran(1, "Kuadran 1 — Baru menunggak & nominal besar")
 with c2:
-    render_kuadran(df_filtered[df_filtered["Kuadran"] == 2], 2, "Kuadran 2 — Tunggakan lama & nominal besar")
+    render_kuadran(2, "Kuadran 2 — Tunggakan lama & nominal besar")
 
 c3, c4 = st.columns(2)
 with c3:
-    render_kuadran(df_filtered[df_filtered["Kuadran"] == 3], 3, "Kuadran 3 — Baru menunggak & nominal kecil")
+    render_kuadran(3, "Kuadran 3 — Baru menunggak & nominal kecil")
 with c4:
-    render_kuadran(df_filtered[df_filtered["Kuadran"] == 4], 4, "Kuadran 4 — Tunggakan lama & nominal kecil")
+    render_kuadran(4, "Kuadran 4 — Tunggakan lama & nominal kecil")
@@ -1,42 +1,33 @@
 import pandas as pd
 import streamlit as st
-from utils.google_utils import get_raw_values
+from utils.services import get_database, get_rekap, is_database_available, is_database_linked
+from utils.kubus import get_kubus, ringkasan_am
+from utils.rekap import rekap_per_am
 from sidebar import menu
-from utils.helpers import is_database_available
 
 st.set_page_config(page_title="Leaderboard AM", layout="wide", page_icon="🏆")
 st.title("📊 Leaderboard AM")
 
-# Pastikan link ada di session_state
-is_database_available()
+# Pastikan link ada di session_state (data detail hanya dimuat kalau REKAP belum ada)
+if not is_database_linked():
+    st.page_link("home.py", label="Home", icon="🏠")
+    st.stop()
 menu()
 
 st.warning("⚠️ Halaman ini masih dalam pengembangan. Sementara, Anda bisa melihat total saldo akhir per AM di bawah ini.")
 
-def to_number(series: pd.Series, allow_parentheses: bool = False) -> pd.Series:
-    s = series.astype(str).str.strip()
-    if allow_parentheses:
-        # (123) -> -123 untuk kolom aging
-        s = s.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
-    # Bersihkan Rupiah & pemisah ribuan gaya Indonesia
-    s = (
-        s.str.replace("Rp", "", regex=False)
-         .str.replace(".", "", regex=False)     # hapus titik ribuan
-         .str.replace(",", ".", regex=False)    # koma -> titik desimal
-         .str.replace(r"[^\d\.\-]", "", regex=True)  # buang karakter lain
-    )
-    return pd.to_numeric(s, errors="coerce")
-    
-# ====== Ambil data dari Google Sheets ======
-df = get_raw_values()
-
-# Pastikan saldo jadi numeric
-df["Saldo Akhir"] = to_number(df["Saldo Akhir"], allow_parentheses=False)
-
-# Group by Nama AM
+# ====== Total per AM (semua periode) dari worksheet REKAP, atau kubus agregat data detail ======
+rekap = get_rekap()
+if rekap is not None:
+    per_am = rekap_per_am(rekap)
+elif is_database_available():
+    per_am = ringkasan_am(get_kubus(get_database()))
+else:
+    st.stop()
+
 leaderboard = (
-    df.groupby("AM", as_index=False)["Saldo Akhir"]
-      .sum()
+    per_am["Saldo Akhir"]
+      .reset_index()
       .sort_values(by="Saldo Akhir", ascending=False)
 )
 
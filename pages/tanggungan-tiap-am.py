@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.google_utils import get_raw_values
-from utils.helpers import is_database_available, pilih_kategori, to_rupiah
-from utils.validation import to_number
+from utils.services import get_database, get_period_values, is_database_linked
+from utils.helpers import pilih_kategori, to_rupiah
+from utils.ui import riwayat_pelanggan_dialog, tabel_berhalaman
+from utils.charts import pie_chart
+from utils.schema import filter_periode
+from utils.kubus import get_kubus, ringkasan_kuadran, ringkasan_am
 from sidebar import menu
 
 
@@ -13,39 +15,34 @@ from sidebar import menu
 st.set_page_config(page_title="Tanggungan tiap AM", layout="wide", page_icon="👤")
 st.title("👤 Tanggungan tiap AM")
 
-# Pastikan link tersedia
-is_database_available()
+# Pastikan link tersedia (data dimuat sesuai periode yang dicari)
+if not is_database_linked():
+    st.page_link("home.py", label="Home", icon="🏠")
+    st.stop()
 menu()
 
 
 # ===============================
 # Fungsi Helper
 # ===============================
-@st.cache_data
-def load_and_clean_data():
-    """Ambil data dari Google Sheets dan lakukan pembersihan/konversi angka."""
-    df = get_raw_values()
-
-    aging_cols = ["0-3 Bulan", "4-6 Bulan", "7-12 Bulan", "13-24 Bulan", "> 24 Bulan"]
-    df[aging_cols] = df[aging_cols].apply(lambda s: to_number(s, allow_parentheses=True))
-    df["Saldo Akhir"] = to_number(df["Saldo Akhir"], allow_parentheses=False)
-    df["Lama Tunggakan"] = to_number(df["Lama Tunggakan"], allow_parentheses=False)
-    df["Kuadran"] = pd.to_numeric(df["Kuadran"], errors="coerce").astype("Int64")
-    return df
+def load_and_clean_data(bulan, tahun):
+    """
+    Ambil data dari Google Sheets (kolom sudah bertipe sesuai skema DATABASE).
+    Kalau bulan tertentu dipilih, hanya rentang baris bulan itu yang dibaca.
+    """
+    if bulan != 0:
+        return get_period_values(f"{bulan}/{tahun}")
+    return get_database()
 
 
 def filter_data(df, nama_am, bulan, tahun, segmen):
     """Filter dataframe berdasarkan segmen, bulan/tahun, dan AM."""
-    # Filter segmen
-    if segmen != "-Semua-":
-        df = df[df["Segmen"] == segmen]
+    # Filter segmen & tanggal lewat index (tahun, bulan, segmen)
+    df = filter_periode(df, bulan, tahun, segmen)
 
-    # Filter tanggal
     if bulan != 0:
         tanggal_label = f"{bulan}/{tahun}"
-        df = df[df["Bulan Tahun"] == tanggal_label]
     else:
-        df = df[df["Bulan Tahun"].str.split("/").str[1] == str(tahun)]
         tanggal_label = f"Semua Bulan/{tahun}"
 
     # Filter nama AM
@@ -61,29 +58,36 @@ def filter_data(df, nama_am, bulan, tahun, segmen):
     return df, df_am, tanggal_label
 
 
+def hitung_ringkasan(df, nama_am, bulan, tahun, segmen):
+    """
+    Total AM yang dicari & total hasil filter, dibaca dari kubus agregat.
+    Kalau nama cocok dengan beberapa AM, jumlah pelanggan unik per AM dijumlahkan.
+    """
+    kubus = get_kubus(df)
+    total = ringkasan_kuadran(kubus, tahun, bulan, segmen).loc[0]
+    if not nama_am:
+        return total, total
+
+    per_am = ringkasan_am(kubus, tahun, bulan, segmen)
+    cocok = per_am.index.str.contains(nama_am, case=False, na=False)
+    return per_am[cocok].sum(), total
+
+
 def create_pie_chart(data, value_col, name_col, title, colors):
-    """Buat pie chart Plotly dengan tema konsisten."""
-    return px.pie(
-        data,
-        values=value_col,
-        names=name_col,
-        title=title,
-        hole=0.3,
-        color=name_col,
-        color_discrete_map=colors
-    )
-
-
-def show_result(df, df_am, nama_am, segmen, tanggal):
+    """Pie chart Plotly dengan tema konsisten (figure di-cache, lihat utils.charts)."""
+    return pie_chart(data, value_col, name_col, title, colors)
+
+
+def show_result(df_am, ringkasan_am_dipilih, ringkasan_total, kriteria=()):
     """Tampilkan hasil visualisasi perbandingan AM vs total."""
     if df_am.empty:
         st.info("Tidak ada data sesuai filter yang dipilih.")
         return
 
-    total_pelanggan_am = df_am["IdNumber"].nunique()
-    total_pelanggan_all = df["IdNumber"].nunique()
-    total_saldo_am = df_am["Saldo Akhir"].sum()
-    total_saldo_all = df["Saldo Akhir"].sum()
+    total_pelanggan_am = int(ringkasan_am_dipilih["Jumlah Pelanggan"])
+    total_pelanggan_all = int(ringkasan_total["Jumlah Pelanggan"])
+    total_saldo_am = ringkasan_am_dipilih["Saldo Akhir"]
+    total_saldo_all = ringkasan_total["Saldo Akhir"]
 
     col1, col2 = st.columns(2)
 
@@ -119,7 +123,13 @@ def show_result(df, df_am, nama_am, segmen, tanggal):
         )
         st.plotly_chart(fig2, use_container_width=True)
 
-    st.dataframe(df_am, use_container_width=True)
+    st.caption("Klik salah satu baris untuk melihat riwayat pelanggan tersebut.")
+    tabel_berhalaman(df_am, key="tanggungan", kunci=kriteria, on_pilih=pilih_riwayat)
+
+
+def pilih_riwayat(pelanggan):
+    """Callback pilih baris tabel: buka riwayat sekali per perubahan pilihan (bukan setiap rerun)."""
+    st.session_state["riwayat_dipilih"] = (pelanggan["IdNumber"], pelanggan["BP Name"])
 
 
 # ===============================
@@ -128,8 +138,19 @@ def show_result(df, df_am, nama_am, segmen, tanggal):
 nama_am = st.text_input("Masukkan Nama AM")
 bulan, tahun, segmen = pilih_kategori()
 
+# Hasil tetap tampil selama filter tidak berubah (klik baris tabel memicu rerun)
+kriteria = (nama_am, bulan, tahun, segmen)
 if st.button("🔍 Cari Tanggungan"):
+    st.session_state["kriteria_tanggungan"] = kriteria
+
+if st.session_state.get("kriteria_tanggungan") == kriteria:
     st.write(f"Mencari tanggungan untuk **{nama_am or 'Semua AM'}** di **{segmen}** pada **{tahun}**...")
-    df = load_and_clean_data()
-    df_filtered, df_am, tanggal_label = filter_data(df, nama_am, bulan, tahun, segmen)
-    show_result(df_filtered, df_am, nama_am, segmen, tanggal_label)
+    df = load_and_clean_data(bulan, tahun)
+    if df.empty:
+        st.info("Tidak ada data sesuai filter yang dipilih.")
+        st.stop()
+    _, df_am, _ = filter_data(df, nama_am, bulan, tahun, segmen)
+    show_result(df_am, *hitung_ringkasan(df, nama_am, bulan, tahun, segmen), kriteria)
+
+    if "riwayat_dipilih" in st.session_state:
+        riwayat_pelanggan_dialog(*st.session_state.pop("riwayat_dipilih"))
@@ -27,7 +27,8 @@ if st.button("🔄 Proses Data"):
     try:
         # Ambil semua values
 
-        df = get_raw_values(st.session_state["upload_gsheet_url"], st.session_state["upload_sheet_name"])
+        # Sheet CYC sering diperbaiki lalu diproses ulang, jadi selalu baca langsung (tanpa cache)
+        df = get_raw_values(st.session_state["upload_gsheet_url"], st.session_state["upload_sheet_name"], use_cache=False)
 
         # st.write("### Data Mentah")
         # st.dataframe(df, use_container_width=True)
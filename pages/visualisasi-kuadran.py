@@ -1,55 +1,57 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.services import is_database_available, get_clean_database, update_keterangan_top_kuadran
+from utils.services import is_database_available, is_database_linked, get_clean_database, get_rekap, update_keterangan_top_kuadran
 from utils.format import to_rupiah
-from utils.ui import pilih_kategori
+from utils.ui import pilih_kategori, riwayat_pelanggan_dialog, tabel_berhalaman
+from utils.schema import filter_periode
+from utils.kubus import get_kubus, ringkasan_kuadran
+from utils.peringkat import urutan_kuadran
+from utils.charts import pie_chart
+from utils.rekap import ringkasan_rekap
 
 
 # ====== Konfigurasi Halaman Kuadran ======
 st.set_page_config(page_title="Kuadran - Dashboard Data Collection", layout="wide", page_icon="📈")
 st.title("🍀 Kuadran")
 
-# ====== Ambil data dari Google Sheets ======
-if not is_database_available():
+# ====== Cek link database (data detail baru dimuat setelah ringkasan) ======
+if not is_database_linked():
     st.page_link("home.py", label="Home", icon="🏠")
     st.stop()
 
 from sidebar import menu
 menu()
 
-df = get_clean_database()
-
 # ====== Filter ====== 
 bulan_target, tahun_target, segmen_target = pilih_kategori()
 
-df_filtered = df.copy()
-
-# Filter segmen (kecuali user pilih Semua Segmen)
-if segmen_target != "-Semua-":
-    df_filtered = df_filtered[df_filtered["Segmen"] == segmen_target]
+# Angka ringkasan (total & per kuadran) dari worksheet REKAP yang kecil, jadi tampil
+# tanpa menunggu DATABASE. Kalau REKAP belum ada, dari kubus agregat data detail.
+rekap = get_rekap()
+if rekap is not None:
+    ringkasan = ringkasan_rekap(rekap, tahun_target, bulan_target, segmen_target)
 else:
-    segmen_target = "Semua Segmen"
+    if not is_database_available():
+        st.page_link("home.py", label="Home", icon="🏠")
+        st.stop()
+    ringkasan = ringkasan_kuadran(get_kubus(get_clean_database()), tahun_target, bulan_target, segmen_target)
+per_kuadran = ringkasan.loc[1:4]
+per_kuadran = per_kuadran[per_kuadran["Jumlah Baris"] > 0]
+
+if segmen_target == "-Semua-":
+    segmen_label = "Semua Segmen"
+else:
+    segmen_label = segmen_target
 
-# Filter bulan/tahun
 if bulan_target != 0:  # user pilih bulan tertentu
     tanggal_target = f"{bulan_target}/{tahun_target}"
-    df_filtered = df_filtered[df_filtered["Bulan Tahun"] == tanggal_target]
 else:  # user pilih "semua bulan"
-    # pastikan format "Bulan Tahun" -> ambil bagian setelah "/"
-    df_filtered = df_filtered[df_filtered["Bulan Tahun"].str.split("/").str[1] == str(tahun_target)]
     tanggal_target = f"Semua Bulan {tahun_target}"
 
 
-# Abaikan pelanggan dengan saldo akhir <= 0
-df_filtered = df_filtered[df_filtered["Saldo Akhir"].astype(float) > 0]
-
-# Cek Filtering
-# st.dataframe(df_filtered)
-
 # ====== Summary Total ======
-total_pelanggan = len(df_filtered)
-total_tunggakan = df_filtered["Saldo Akhir"].sum(skipna=True)
+total_pelanggan = int(ringkasan.loc[0, "Jumlah Baris"])
+total_tunggakan = ringkasan.loc[0, "Saldo Akhir"]
 
 # Urutan kuadran
 order = ["Kuadran 1", "Kuadran 2", "Kuadran 3", "Kuadran 4"]
@@ -62,68 +64,50 @@ kuadran_colors = {
 # E63946 RED
 }
 
-st.divider()
-st.markdown(f"<h2 style='text-align: center; font-weight: bold;'>Ringkasan {segmen_target} — {tanggal_target}</h2>", unsafe_allow_html=True)
-m1, m2 = st.columns(2)
-
-with m1:
-    st.metric("Total Pelanggan", total_pelanggan)
-
-    # Data jumlah pelanggan per kuadran
-    pie_data = (
-        df_filtered.groupby("Kuadran", dropna=True)["IdNumber"]
-        .count()
-        .reset_index(name="Jumlah Pelanggan")
-    )
-
-    if not pie_data.empty:
-        # pie_data = pie_data.sort_values("Kuadran").reset_index(drop=True)
-        pie_data["Kuadran"] = pie_data["Kuadran"].apply(lambda q: f"Kuadran {q}")
-        # pie_data["Kuadran"] = pd.Categorical(pie_data["Kuadran"], categories=order, ordered=True)
-        # pie_data = pie_data.sort_values("Kuadran")
-
-        fig = px.pie(
-            pie_data,
-            values="Jumlah Pelanggan",
-            names="Kuadran",
-            title="Proporsi Jumlah Pelanggan per Kuadran",
-            hole=0.3,
-            color="Kuadran",
-            color_discrete_map=kuadran_colors,
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Tidak ada data Proporsi Jumlah Pelanggan per Kuadran.")
-
-
-with m2:
-    st.metric("Total Tunggakan", to_rupiah(total_tunggakan))
-
-    # Data total saldo akhir per kuadran
-    pie_data = (
-        df_filtered.groupby("Kuadran", dropna=True)["Saldo Akhir"]
-        .sum()
-        .reset_index()
-    )
-    # st.dataframe(pie_data, use_container_width=True)
-    if not pie_data.empty:
-        # pie_data = pie_data.sort_values("Kuadran").reset_index(drop=True)
-        pie_data["Kuadran"] = pie_data["Kuadran"].apply(lambda q: f"Kuadran {q}")
-        # pie_data["Kuadran"] = pd.Categorical(pie_data["Kuadran"], categories=order, ordered=False)
-        # pie_data = pie_data.sort_values("Kuadran")
-
-        fig = px.pie(
-            pie_data,
-            values="Saldo Akhir",
-            names="Kuadran",
-            title="Proporsi Jumlah Tunggakan per Kuadran",
-            hole=0.3,
-            color="Kuadran",
-            color_discrete_map=kuadran_colors,
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Tidak ada data Proporsi Jumlah Tunggakan per Kuadran.")
+# Ringkasan & pie tidak ikut dijalankan ulang saat kartu kuadran / tabel diedit
+@st.fragment
+def tampilkan_ringkasan():
+    st.divider()
+    st.markdown(f"<h2 style='text-align: center; font-weight: bold;'>Ringkasan {segmen_label} — {tanggal_target}</h2>", unsafe_allow_html=True)
+    m1, m2 = st.columns(2)
+
+    with m1:
+        st.metric("Total Pelanggan", total_pelanggan)
+
+        # Data jumlah pelanggan per kuadran
+        pie_data = per_kuadran["Jumlah Baris"].reset_index(name="Jumlah Pelanggan")
+
+        if not pie_data.empty:
+            # pie_data = pie_data.sort_values("Kuadran").reset_index(drop=True)
+            pie_data["Kuadran"] = pie_data["Kuadran"].apply(lambda q: f"Kuadran {q}")
+            # pie_data["Kuadran"] = pd.Categorical(pie_data["Kuadran"], categories=order, ordered=True)
+            # pie_data = pie_data.sort_values("Kuadran")
+
+            fig = pie_chart(pie_data, "Jumlah Pelanggan", "Kuadran", "Proporsi Jumlah Pelanggan per Kuadran", kuadran_colors)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Tidak ada data Proporsi Jumlah Pelanggan per Kuadran.")
+
+
+    with m2:
+        st.metric("Total Tunggakan", to_rupiah(total_tunggakan))
+
+        # Data total saldo akhir per kuadran
+        pie_data = per_kuadran["Saldo Akhir"].reset_index()
+        # st.dataframe(pie_data, use_container_width=True)
+        if not pie_data.empty:
+            # pie_data = pie_data.sort_values("Kuadran").reset_index(drop=True)
+            pie_data["Kuadran"] = pie_data["Kuadran"].apply(lambda q: f"Kuadran {q}")
+            # pie_data["Kuadran"] = pd.Categorical(pie_data["Kuadran"], categories=order, ordered=False)
+            # pie_data = pie_data.sort_values("Kuadran")
+
+            fig = pie_chart(pie_data, "Saldo Akhir", "Kuadran", "Proporsi Jumlah Tunggakan per Kuadran", kuadran_colors)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Tidak ada data Proporsi Jumlah Tunggakan per Kuadran.")
+
+
+tampilkan_ringkasan()
 
 
 # ====== Komponen Kuadran ======
@@ -138,18 +122,43 @@ def format_saldo(value: float) -> str:
     else:
         return str(int(value))
 
-def render_kuadran(dfq: pd.DataFrame, kuadran_num: int, judul: str):
+def key_editor(kuadran_num: int) -> str:
+    # key ikut filter, supaya edit tidak menempel ke baris lain setelah filter berubah
+    return f"editor_{kuadran_num}_{bulan_target}_{tahun_target}_{segmen_target}"
+
+
+def catat_perubahan(key: str, top3: pd.DataFrame, edited_top3: pd.DataFrame):
+    """
+    Simpan Keterangan yang berubah ke buffer `keterangan_pending`
+    (key editor -> {(IdNumber, Segmen, Bulan Tahun) -> Keterangan}). Edit yang
+    dikembalikan ke nilai awal dibuang dari buffer.
+    """
+    pending = st.session_state.setdefault("keterangan_pending", {}).setdefault(key, {})
+    for awal, baru, *kunci in zip(
+        top3["Keterangan"], edited_top3["Keterangan"],
+        top3["IdNumber"], top3["Segmen"].astype(str), top3["Bulan Tahun"].astype(str),
+    ):
+        baru = "" if pd.isna(baru) else baru
+        if baru != awal:
+            pending[tuple(kunci)] = baru
+        else:
+            pending.pop(tuple(kunci), None)
+
+
+# Edit sel hanya menjalankan ulang kartu kuadran itu, bukan seluruh halaman
+@st.fragment
+def render_kuadran(kuadran_num: int, judul: str):
     with st.container(border=True):
         st.markdown(f" #### {judul}")
 
-        if dfq.empty:
+        if len(urutan[kuadran_num]) == 0:
             st.info("Tidak ada data di kuadran ini.")
-            return None
+            return
 
-        jml = len(dfq)
+        jml = int(ringkasan.loc[kuadran_num, "Jumlah Baris"])
         persen_plg = (jml / total_pelanggan * 100) if total_pelanggan else 0.0
 
-        total_nom = dfq["Saldo Akhir"].sum(skipna=True)
+        total_nom = ringkasan.loc[kuadran_num, "Saldo Akhir"]
   
         persen_nom = (total_nom / total_tunggakan * 100) if total_tunggakan else 0.0
 
@@ -160,65 +169,111 @@ def render_kuadran(dfq: pd.DataFrame, kuadran_num: int, judul: str):
             st.markdown(f"Total tunggakan: **{format_saldo(total_nom)}** ({persen_nom:.1f}%)")
 
         # Top 3 by Saldo Akhir
-        top3 = dfq.sort_values("Saldo Akhir", ascending=False).head(3).copy()
+        top3 = df_filtered.iloc[urutan[kuadran_num][:3]].reset_index(drop=True)
         top3["Saldo"] = top3["Saldo Akhir"].apply(format_saldo)
 
+        # Segmen & Bulan Tahun ikut dikirim (tidak ditampilkan) sebagai kunci update ke sheet
         edited_top3 = st.data_editor(
-            top3[["IdNumber", "BP Name", "Saldo", "AM", "Keterangan"]],
+            top3[["IdNumber", "BP Name", "Saldo", "AM", "Keterangan", "Segmen", "Bulan Tahun"]],
             hide_index=True,
             use_container_width=True,
-            disabled=["IdNumber", "BP Name", "Saldo", "AM" ],  # biar yg tampil cuma view
-            key=f"editor_{kuadran_num}"
+            column_order=["IdNumber", "BP Name", "Saldo", "AM", "Keterangan"],
+            disabled=["IdNumber", "BP Name", "Saldo", "AM", "Segmen", "Bulan Tahun"],  # biar yg tampil cuma view
+            key=key_editor(kuadran_num)
         )
+        catat_perubahan(key_editor(kuadran_num), top3, edited_top3)
+
+        # Riwayat tiap pelanggan top 3 di seluruh periode
+        # Key per posisi baris & periode: dengan filter "semua bulan", pelanggan yang sama
+        # bisa muncul lebih dari sekali di top 3
+        for i, (col, (_, row)) in enumerate(zip(st.columns(3), top3.iterrows())):
+            key_riwayat = f"riwayat_{kuadran_num}_{bulan_target}_{tahun_target}_{segmen_target}_{i}_{row['IdNumber']}_{row['Bulan Tahun']}"
+            if col.button(f"📜 {row['IdNumber']}", key=key_riwayat, use_container_width=True):
+                riwayat_pelanggan_dialog(row["IdNumber"], row["BP Name"])
+
+
+
+
+# ====== Data detail untuk top 3 & tabel lengkap ======
+if not is_database_available():
+    st.page_link("home.py", label="Home", icon="🏠")
+    st.stop()
+
+df = get_clean_database()
+
+# Filter segmen & bulan/tahun lewat index (tahun, bulan, segmen)
+df_filtered = filter_periode(df, bulan_target, tahun_target, segmen_target)
+
+# Abaikan pelanggan dengan saldo akhir <= 0
+df_filtered = df_filtered[df_filtered["Saldo Akhir"] > 0]
 
-        # hasil edit tetap update ke kolom "Keterangan", sedangkan "Saldo Akhir" asli tidak terganggu
-        return edited_top3
+# Posisi baris per kuadran (urut Saldo Akhir terbesar) untuk top 3 & tabel lengkap
+urutan = urutan_kuadran(df_filtered, (bulan_target, tahun_target, segmen_target))
 
 
+# Edit dari filter lain tidak terlihat lagi di editor (widgetnya sudah hilang),
+# jadi dibuang dari buffer supaya tidak ikut tersimpan diam-diam
+editor_aktif = [key_editor(q) for q in range(1, 5)]
+st.session_state["keterangan_pending"] = {
+    key: edit for key, edit in st.session_state.get("keterangan_pending", {}).items() if key in editor_aktif
+}
 
+if "pesan_simpan" in st.session_state:
+    st.toast(st.session_state.pop("pesan_simpan"))
 
 # ====== Grid 2x2 Kuadran ======
 st.divider()
-st.markdown(f"<h2 style='text-align: center; font-weight:bold'>Kuadran {segmen_target} — {tanggal_target}</h2>", unsafe_allow_html=True)
+st.markdown(f"<h2 style='text-align: center; font-weight:bold'>Kuadran {segmen_label} — {tanggal_target}</h2>", unsafe_allow_html=True)
 # st.markdown("### Dataframe Kuadran")
 # st.dataframe(df_filtered)
 # TODO bikin tombol edit di kanan pojok ujung dan beri info kalo user sedang mengedit, kalo user submit edit maka akan memperbauri df pusat
 
 c1, c2 = st.columns(2)
 with c1:
-    edit1 = render_kuadran(df_filtered[df_filtered["Kuadran"] == 1], 1, "Kuadran 1 — Baru Mengunggak & Nominal Besar")
+    render_kuadran(1, "Kuadran 1 — Baru Mengunggak & Nominal Besar")
 with c2:
-    edit2 = render_kuadran(df_filtered[df_filtered["Kuadran"] == 2], 2, "Kuadran 2 — Tunggakan Lama & Nominal Besar")
+    render_kuadran(2, "Kuadran 2 — Tunggakan Lama & Nominal Besar")
 
 c3, c4 = st.columns(2)
 with c3:
-    edit3 = render_kuadran(df_filtered[df_filtered["Kuadran"] == 3], 3, "Kuadran 3 — Baru Menunggak & Nominal Kecil")
+    render_kuadran(3, "Kuadran 3 — Baru Menunggak & Nominal Kecil")
 with c4:
-    edit4 = render_kuadran(df_filtered[df_filtered["Kuadran"] == 4], 4, "Kuadran 4 — Tunggakan Lama & Nominal Kecil")
-
-if st.button("💾 Simpan Semua Perubahan", use_container_width=True):
-    try:
-        # Gabungkan hasil edit dari semua kuadran (abaikan yang None)
-        df_all_edited = pd.concat(
-            [df for df in [edit1, edit2, edit3, edit4] if df is not None],
-            ignore_index=True
-        )
-
-        # Update ke session_state df_database_clean
-        for _, row in df_all_edited.iterrows():
-            mask = (
-                (st.session_state["df_database_clean"]["IdNumber"] == row["IdNumber"]) &
-                (st.session_state["df_database_clean"]["Segmen"] == row["Segmen"]) &
-                (st.session_state["df_database_clean"]["Bulan Tahun"] == row["Bulan Tahun"])
+    render_kuadran(4, "Kuadran 4 — Tunggakan Lama & Nominal Kecil")
+
+@st.fragment
+def simpan_perubahan():
+    """Kirim isi buffer `keterangan_pending` ke Google Sheet (satu batch_update)."""
+    if st.button("💾 Simpan Semua Perubahan", use_container_width=True):
+        pending = {
+            kunci: ket
+            for edit in st.session_state.get("keterangan_pending", {}).values()
+            for kunci, ket in edit.items()
+        }
+        if not pending:
+            st.toast("Tidak ada perubahan untuk disimpan.")
+            return
+        try:
+            df_all_edited = pd.DataFrame(
+                [(*kunci, ket) for kunci, ket in pending.items()],
+                columns=["IdNumber", "Segmen", "Bulan Tahun", "Keterangan"],
             )
-            st.session_state["df_database_clean"].loc[mask, "Keterangan"] = row["Keterangan"]
 
-        # Update ke Google Sheet
-        update_keterangan_top_kuadran(df_edited=df_all_edited)
-        st.toast("✅ Semua perubahan berhasil disimpan!")
+            # Update ke Google Sheet (satu batch_update); cache bersama ikut dibuang
+            update_keterangan_top_kuadran(df_edited=df_all_edited)
+        except Exception as e:
+            st.error(f"Gagal menyimpan perubahan: {e}")
+            return
+
+        # Kosongkan buffer & isi editor, lalu gambar ulang seluruh halaman
+        # (kartu kuadran & tabel lengkap) dari data yang baru dimuat
+        st.session_state["keterangan_pending"] = {}
+        for key in editor_aktif:
+            st.session_state.pop(key, None)
+        st.session_state["pesan_simpan"] = "✅ Semua perubahan berhasil disimpan!"
+        st.rerun()
+
 
-    except Exception as e:
-        st.error(f"Gagal menyimpan perubahan: {e}")
+simpan_perubahan()
 
 st.divider()
 
@@ -245,16 +300,22 @@ st.markdown(
 )
 
 
-with st.expander("View More"):
-    tab_names = ["Kuadran 1", "Kuadran 2", "Kuadran 3", "Kuadran 4"]
-    tabs = st.tabs(tab_names)
+# Ganti halaman / urutan tabel hanya menjalankan ulang bagian ini
+@st.fragment
+def tampilkan_tabel_lengkap():
+    with st.expander("View More"):
+        tab_names = ["Kuadran 1", "Kuadran 2", "Kuadran 3", "Kuadran 4"]
+        tabs = st.tabs(tab_names)
 
-    for i, tab in enumerate(tabs, start=1):  # start=1 biar sesuai kuadran
-        with tab:
-            st.dataframe(
-                df_filtered[df_filtered["Kuadran"] == i]
-                .sort_values("Saldo Akhir", ascending=False)
-                .reset_index(drop=True),
-                use_container_width=True,
-                height=600
-            )
+        for i, tab in enumerate(tabs, start=1):  # start=1 biar sesuai kuadran
+            with tab:
+                # Hanya satu halaman yang dikirim ke browser (urutan bawaan: Saldo Akhir terbesar)
+                tabel_berhalaman(
+                    df_filtered,
+                    key=f"view_more_{i}",
+                    posisi=urutan[i],
+                    kunci=(bulan_target, tahun_target, segmen_target),
+                )
+
+
+tampilkan_tabel_lengkap()
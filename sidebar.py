@@ -11,6 +11,7 @@ def menu():
         st.subheader("Visualisasi Data")
         st.page_link("pages/visualisasi-kuadran.py", label="Kuadran", icon="🍀")
         st.page_link("pages/tanggungan-tiap-am.py", label="Tanggungan tiap AM", icon="👤")
+        st.page_link("pages/cari-pelanggan.py", label="Cari Pelanggan", icon="🔎")
         st.page_link("pages/leaderboard-am.py", label="Leaderboard AM", icon="🏆")
         st.page_link("pages/collection-performance.py", label="Collection Performance", icon="📈")
         # st.page_link("pages/saldo_akhir_per_bulan.py", label="Saldo Akhir per Bulan")
@@ -0,0 +1,96 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+# Figure disimpan dengan cache_resource (tanpa pickle per pemanggilan) dan dibagikan
+# ke semua session. Kunci cache = hash data agregat kecil + argumen styling,
+# jadi figure hanya dibangun ulang kalau angka atau warnanya berubah.
+# Pemanggil selalu menerima salinan (`go.Figure(fig)`), jadi boleh diubah
+# (update_layout, add_trace, ...) tanpa memengaruhi session lain.
+
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _pie_chart(data: pd.DataFrame, values: str, names: str, title: str, colors: dict | None, hole: float) -> go.Figure:
+    return px.pie(
+        data,
+        values=values,
+        names=names,
+        title=title,
+        hole=hole,
+        color=names,
+        color_discrete_map=colors,
+    )
+
+
+def pie_chart(data: pd.DataFrame, values: str, names: str, title: str, colors: dict | None = None, hole: float = 0.3) -> go.Figure:
+    """
+    Pie chart Plotly dengan tema konsisten.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Data agregat (beberapa baris saja).
+    values, names : str
+        Kolom nilai & kolom label (sekaligus kolom warna).
+    colors : dict, optional
+        Label -> warna; None memakai warna bawaan Plotly.
+    """
+    return go.Figure(_pie_chart(data, values, names, title, colors, hole))
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _collection_performance_chart(df: pd.DataFrame, title: str, colors: dict) -> go.Figure:
+    df_long = df.melt(id_vars="BULAN", var_name="Segmen", value_name="Persentase")
+
+    fig = go.Figure()
+
+    # Tambahkan Rata-rata sebagai area abu-abu
+    df_avg = df_long[df_long["Segmen"] == "Rata-rata"]
+    fig.add_trace(
+        go.Scatter(
+            x=df_avg["BULAN"],
+            y=df_avg["Persentase"],
+            mode="lines",
+            name="Rata-rata",
+            line=dict(color="#fde8bd", width=2, dash="dot"),
+            fill="tozeroy",
+            fillcolor="rgba(253,240,213,0.3)"
+        )
+    )
+
+    # Tambahkan segmen
+    for segmen in df_long["Segmen"].unique():
+        if segmen == "Rata-rata":
+            continue
+        df_seg = df_long[df_long["Segmen"] == segmen]
+        fig.add_trace(
+            go.Scatter(
+                x=df_seg["BULAN"],
+                y=df_seg["Persentase"],
+                mode="lines+markers",
+                name=segmen,
+                line=dict(color=colors.get(segmen, None))  # warna sesuai mapping
+            )
+        )
+
+    fig.update_layout(
+        title=f"Collection Performance {title}",
+        yaxis=dict(ticksuffix="%"),
+        legend=dict(title="Segmen")
+    )
+    return fig
+
+
+def collection_performance_chart(df: pd.DataFrame, title: str, colors: dict) -> go.Figure:
+    """
+    Line chart collection performance per segmen, dengan "Rata-rata" sebagai area abu-abu.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Kolom "BULAN" + satu kolom persentase per segmen (termasuk "Rata-rata").
+    colors : dict
+        Segmen -> warna garis.
+    """
+    return go.Figure(_collection_performance_chart(df, title, colors))
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-import re
 import numpy as np
-from utils.services import get_raw_values
+from utils.services import get_raw_values, get_database, invalidate_cache, update_column_cells, update_rekap, baris_sheet
+from utils.schema import parse_angka, apply_schema, BATAS_KUADRAN_SCHEMA
 
 
 def cast_to_number(
@@ -37,49 +37,8 @@ def cast_to_number(
     DEFAULT_EXCLUDE = ["BP Name", "AM", "Keterangan", "Segmen", "Bulan Tahun", "Last Updated"]
 
 
-    def _clean(series: pd.Series) -> pd.Series:
-        s = series.astype(str).str.strip()
-
-        def normalize(x: str) -> str:
-            if x in ["", "nan", "None"]:
-                return "0"
-
-            negative = False
-            if "(" in x and ")" in x:   # deteksi kurung
-                negative = True
-                x = x.replace("(", "").replace(")", "")
-
-            # Hilangkan Rp, spasi
-            x = x.replace("Rp", "").replace(" ", "")
-
-            # Case: ada koma dan titik (Indonesia/Eropa: 123.456,78)
-            if "," in x and "." in x:
-                x = x.replace(".", "").replace(",", ".")
-            
-            # Case: hanya koma
-            elif "," in x:
-                if len(x.split(",")[-1]) == 2:  # anggap desimal -> buang
-                    x = x.replace(",", "")
-                else:  # anggap ribuan
-                    x = x.replace(",", "")
-            
-            # Case: hanya titik
-            elif "." in x:
-                if len(x.split(".")[-1]) == 2:  # anggap desimal -> buang
-                    x = x.replace(".", "")
-                else:  # anggap ribuan
-                    x = x.replace(".", "")
-
-            # Buang karakter lain selain digit & minus
-            x = re.sub(r"[^\d\.\-]", "", x)
-
-            if negative and not x.startswith("-"):
-                x = "-" + x
-            return x
-
-        s = s.apply(normalize)
-        return pd.to_numeric(s, errors="coerce").fillna(0)
-
+    # Aturan parse ada di utils.schema.parse_angka (parser angka tunggal)
+    _clean = parse_angka
 
     if isinstance(data, pd.Series):
         # st.write("### Data _clean Series")
@@ -134,42 +93,174 @@ def to_rupiah(n: float | int) -> str:
     return f"Rp {s}"
 
 
-def get_batas_kuadran(segmen_target: str):
-    df = get_raw_values(st.session_state["database_gsheet_url"], "Batas Kuadran")
+def get_tabel_batas_kuadran(use_cache: bool = True) -> pd.DataFrame:
+    """
+    Ambil tabel batas kuadran semua segmen sekaligus (satu kali baca sheet
+    "Batas Kuadran" per proses/batch).
+
+    Parameters
+    ----------
+    use_cache : bool
+        False untuk membaca isi sheet saat ini (mis. tepat sebelum batas ditulis ulang),
+        bukan salinan cache bersama.
+
+    Returns
+    -------
+    pd.DataFrame
+        Index: Segmen. Kolom: "Batas Nominal", "Batas Waktu (bulan)" (float).
+        DataFrame kosong kalau sheet tidak berisi data.
+    """
+    df = get_raw_values(st.session_state["database_gsheet_url"], "Batas Kuadran", use_cache=use_cache)
     if df.empty:
+        return pd.DataFrame(columns=["Batas Nominal", "Batas Waktu (bulan)"])
+
+    df = apply_schema(df, BATAS_KUADRAN_SCHEMA)
+    # Segmen ganda: baris pertama yang dipakai (sama seperti sebelumnya)
+    df = df.drop_duplicates("Segmen", keep="first").set_index("Segmen")
+    return df[["Batas Nominal", "Batas Waktu (bulan)"]]
+
+
+def get_batas_kuadran(segmen_target: str):
+    batas = get_tabel_batas_kuadran()
+    if batas.empty:
         st.warning("❌ Data batas kuadran tidak ditemukan.")
         return None
 
-    df_filtered = df[df["Segmen"] == segmen_target]
-    if df_filtered.empty:
+    if segmen_target not in batas.index:
         st.warning(f"❌ Data batas kuadran untuk segmen '{segmen_target}' tidak ditemukan.")
         return None
 
-    row = df_filtered.iloc[0]
+    row = batas.loc[segmen_target]
+    return row["Batas Nominal"], row["Batas Waktu (bulan)"]
+
 
-    # Bersihkan nominal: hilangkan Rp dan titik ribuan
-    row = cast_to_number(row)
+def klasifikasi_kuadran(saldo, lama_tunggakan, batas_nominal, batas_waktu) -> np.ndarray:
+    """
+    Tentukan kuadran secara vektor (semua argumen boleh array atau skalar).
 
-    return row["Batas Nominal"], row["Batas Waktu (bulan)"]
+    - Kuadran 1: Saldo Akhir > batas nominal  & Lama Tunggakan <= batas waktu
+    - Kuadran 2: Saldo Akhir > batas nominal  & Lama Tunggakan >  batas waktu
+    - Kuadran 3: Saldo Akhir <= batas nominal & Lama Tunggakan <= batas waktu
+    - Kuadran 4: sisanya
 
-def tentukan_kuadran(df, segmen):
-    batas_nominal, batas_waktu = get_batas_kuadran(segmen)
+    Returns
+    -------
+    np.ndarray
+        Array int berisi nomor kuadran 1-4.
+    """
+    saldo = np.asarray(saldo, dtype=float)
+    lama_tunggakan = np.asarray(lama_tunggakan, dtype=float)
+    besar = saldo > batas_nominal
+    kecil = saldo <= batas_nominal
+    baru = lama_tunggakan <= batas_waktu
+    lama = lama_tunggakan > batas_waktu
+    return np.select([besar & baru, besar & lama, kecil & baru], [1, 2, 3], default=4)
 
-    st.success(f"✅ Berhasil pilih Segmen **{segmen}**, dengan Batas Nominal **{to_rupiah(batas_nominal)}** dan Lama Tunggakan **{batas_waktu:.0f} bulan**")
 
-    def cek_kuadran(row):
-        if row["Saldo Akhir"] > batas_nominal and row["Lama Tunggakan"] <= batas_waktu:
-            return 1
-        elif row["Saldo Akhir"] > batas_nominal and row["Lama Tunggakan"] > batas_waktu:
-            return 2
-        elif row["Saldo Akhir"] <= batas_nominal and row["Lama Tunggakan"] <= batas_waktu:
-            return 3
-        else:
-            return 4
+def tentukan_kuadran(df, segmen=None, batas=None, tampilkan_pesan=True):
+    """
+    Isi kolom 'Kuadran' untuk semua baris sekaligus.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Harus punya kolom 'Saldo Akhir' & 'Lama Tunggakan' (numerik), dan
+        'Segmen' kalau `segmen` tidak diisi.
+    segmen : str, optional
+        Segmen untuk semua baris. None / "-Semua-" -> pakai kolom 'Segmen' tiap baris.
+    batas : pd.DataFrame, optional
+        Hasil `get_tabel_batas_kuadran()`; diisi kalau sudah diambil sebelumnya
+        supaya sheet tidak dibaca ulang.
+    tampilkan_pesan : bool
+        Tampilkan batas yang dipakai per segmen (`st.success`). False untuk
+        pemanggil batch seperti `reklasifikasi_kuadran`.
 
-    df["Kuadran"] = df.apply(cek_kuadran, axis=1)
+    Returns
+    -------
+    pd.DataFrame
+        `df` dengan kolom 'Kuadran' (Int64; NA kalau segmen tidak punya batas).
+    """
+    if batas is None:
+        batas = get_tabel_batas_kuadran()
+
+    if segmen in (None, "-Semua-"):
+        segmen_baris = df["Segmen"].to_numpy()
+    else:
+        segmen_baris = np.full(len(df), segmen, dtype=object)
+
+    # Join setiap baris ke batas segmennya
+    batas_baris = batas.reindex(segmen_baris)
+    batas_nominal = batas_baris["Batas Nominal"].to_numpy()
+    batas_waktu = batas_baris["Batas Waktu (bulan)"].to_numpy()
+
+    kuadran = klasifikasi_kuadran(df["Saldo Akhir"], df["Lama Tunggakan"], batas_nominal, batas_waktu)
+    tanpa_batas = np.isnan(batas_nominal) | np.isnan(batas_waktu)
+    df["Kuadran"] = pd.array(kuadran, dtype="Int64")
+    df.loc[tanpa_batas, "Kuadran"] = pd.NA
+
+    if tanpa_batas.any():
+        st.warning(
+            f"❌ Data batas kuadran untuk segmen {sorted(set(segmen_baris[tanpa_batas]))} "
+            f"tidak ditemukan, kuadran baris tersebut dikosongkan."
+        )
+    if tampilkan_pesan:
+        for seg in pd.unique(segmen_baris[~tanpa_batas]):
+            nominal, waktu = batas.loc[seg]
+            st.success(f"✅ Berhasil pilih Segmen **{seg}**, dengan Batas Nominal **{to_rupiah(nominal)}** dan Lama Tunggakan **{waktu:.0f} bulan**")
     return df
 
+def reklasifikasi_kuadran(segmen=None, batas=None) -> int:
+    """
+    Hitung ulang kolom 'Kuadran' seluruh periode di worksheet DATABASE
+    (mis. setelah Batas Kuadran diubah) dan tulis balik hanya sel yang berubah.
+
+    Parameters
+    ----------
+    segmen : list[str], optional
+        Segmen yang dihitung ulang. None -> semua segmen.
+    batas : pd.DataFrame, optional
+        Tabel batas dari `get_tabel_batas_kuadran()` (dibaca kalau tidak diisi).
+
+    Returns
+    -------
+    int
+        Jumlah sel Kuadran yang diperbarui.
+    """
+    # Baca ulang supaya posisi baris sesuai isi sheet saat ini
+    invalidate_cache()
+    df = get_database()
+    if df.empty:
+        return 0
+    if segmen is not None:
+        df = df[df["Segmen"].isin(segmen)]
+
+    lama = df["Kuadran"].to_numpy(dtype=float, na_value=np.nan)
+    baru = tentukan_kuadran(df.copy(), batas=batas, tampilkan_pesan=False)["Kuadran"].to_numpy(dtype=float, na_value=np.nan)
+
+    # Segmen tanpa batas (NA) dibiarkan, selain itu tulis kalau berbeda
+    berubah = ~np.isnan(baru) & (np.isnan(lama) | (baru != lama))
+    if not berubah.any():
+        return 0
+
+    df_berubah = df[berubah]
+    partisi = set(df_berubah[["Bulan Tahun", "Segmen"]].astype(str).itertuples(index=False, name=None))
+    update_column_cells(
+        "Kuadran",
+        baris_sheet(df_berubah),
+        baru[berubah].astype(int),
+        partitions=partisi,
+    )
+
+    # REKAP ikut diperbarui untuk partisi yang Kuadran-nya berubah
+    df_akhir = df.assign(Kuadran=pd.array(np.where(berubah, baru, lama)).astype("Int64"))
+    update_rekap({
+        key: grp
+        for key, grp in df_akhir.groupby(["Bulan Tahun", "Segmen"], observed=True)
+        if key in partisi
+    })
+    return int(berubah.sum())
+
+
 def _sanitize_text_column(df: pd.DataFrame, colname: str, default: str = "-") -> pd.DataFrame:
     """Pastikan kolom teks ada, dan isi yang kosong/NaN diganti default."""
     if colname not in df.columns:
@@ -219,8 +310,14 @@ def validasi_data_upload(df_upload: pd.DataFrame, tanggal_target: str, segmen_ta
     # st.write("### Data Cast to Number")
     # st.dataframe(df_upload)
 
-    # Tambahkan kolom tambahan
-    df_upload["Segmen"] = segmen_target if segmen_target != "--Semua--" else "-"
+    # Tambahkan kolom tambahan. Upload semua segmen memakai kolom Segmen dari file.
+    if segmen_target == "-Semua-":
+        if "Segmen" not in df_upload.columns:
+            st.error("❌ Upload untuk semua segmen membutuhkan kolom 'Segmen' di file.")
+            st.stop()
+        df_upload = _sanitize_text_column(df_upload, "Segmen")
+    else:
+        df_upload["Segmen"] = segmen_target
     df_upload["Bulan Tahun"] = tanggal_target
     df_upload["Lama Tunggakan"] = np.select(
             [
@@ -1,56 +1,9 @@
 import streamlit as st
-import gspread
-import pandas as pd
 from gspread_dataframe import set_with_dataframe
-from google.oauth2.service_account import Credentials
 
-@st.cache_resource
-def get_client():
-    creds = Credentials.from_service_account_info(
-        st.secrets["gcp_service_account"],
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    return gspread.authorize(creds)
-
-def get_worksheet(link_spreadsheet=None, nama_worksheet="DATABASE"):
-    """
-    Ambil worksheet tertentu dari Google Spreadsheet.
-    Param:
-        - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
-        - nama_worksheet (str): nama tab worksheet (default "DATABASE")
-    Return:
-        - worksheet object
-    """
-    if link_spreadsheet is None:
-        link_spreadsheet = st.session_state.get("database_gsheet_url", "")
-    if nama_worksheet is None:
-        nama_worksheet = st.session_state.get("database_sheet_name", "DATABASE")
-
-    if not link_spreadsheet:
-        raise ValueError("❌ Link spreadsheet tidak ditemukan.")
-    
-    client = get_client()
-    return client.open_by_url(link_spreadsheet).worksheet(nama_worksheet)
-
-
-def get_raw_values(link_spreadsheet=None, nama_worksheet="DATABASE"):
-    
-    if link_spreadsheet is None:
-        link_spreadsheet = st.session_state.get("database_gsheet_url", "")
-    if nama_worksheet is None:
-        nama_worksheet = st.session_state.get("database_sheet_name", "DATABASE")
-
-    # ====== Ambil data dari Google Sheets ======
-    ws = get_worksheet(link_spreadsheet, nama_worksheet)
-    raw = ws.get_all_values()
-
-    if not raw:
-        st.warning(f"Sheet {nama_worksheet} kosong.")
-        return pd.DataFrame()
-
-    # DataFrame dengan header baris pertama
-    df = pd.DataFrame(raw[1:], columns=raw[0])
-    return df
+# Client, worksheet & cache baca dipusatkan di utils.services supaya
+# halaman lama yang masih import dari sini ikut memakai cache bersama.
+from utils.services import get_client, get_worksheet, get_raw_values
 
 def replace_bulan_segmen(worksheet, bulan, segmen, df_baru):
     """
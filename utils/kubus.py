@@ -0,0 +1,123 @@
+from itertools import product
+
+import pandas as pd
+import streamlit as st
+
+from utils.schema import AGING_COLS, SEMUA, VERSI
+
+# Dimensi kubus. Nilai "semua" (roll-up): bulan 0, segmen/AM "-Semua-", Kuadran 0
+KUNCI_KUBUS = ["tahun", "bulan", "segmen", "AM", "Kuadran"]
+ROLLUP = {"bulan": 0, "segmen": SEMUA, "AM": SEMUA, "Kuadran": 0}
+
+UKURAN = ["Jumlah Baris", "Jumlah Pelanggan", "Saldo Akhir", *AGING_COLS]
+
+
+def bangun_kubus(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agregat (tahun, bulan, segmen, AM, Kuadran) dari DataFrame database
+    hasil `index_periode`, untuk semua widget ringkasan.
+
+    Hanya pelanggan dengan Saldo Akhir > 0 yang dihitung (sama seperti halaman
+    kuadran & tanggungan AM). Semua kombinasi roll-up (`ROLLUP`) ikut dihitung
+    dari baris detail, jadi "Jumlah Pelanggan" (IdNumber unik) tetap tepat
+    untuk pilihan "-Semua-". Baris tanpa Kuadran hanya masuk ke Kuadran 0.
+
+    Returns
+    -------
+    pd.DataFrame
+        Index `KUNCI_KUBUS` (tersortir), kolom `UKURAN`:
+        jumlah baris, IdNumber unik, total Saldo Akhir & total per kolom aging
+        (kolom aging yang tidak ada di `df` dilewati).
+    """
+    df = df[df["Saldo Akhir"] > 0]
+    kolom_jumlah = [col for col in ["Saldo Akhir", *AGING_COLS] if col in df.columns]
+    detail = pd.DataFrame({
+        "tahun": df.index.get_level_values("tahun"),
+        "bulan": df.index.get_level_values("bulan"),
+        "segmen": df.index.get_level_values("segmen"),
+        "AM": df["AM"].astype(str).to_numpy(),
+        "Kuadran": df["Kuadran"].to_numpy(),
+        "IdNumber": df["IdNumber"].to_numpy(),
+        **{col: df[col].to_numpy() for col in kolom_jumlah},
+    })
+
+    agg = {
+        "Jumlah Baris": ("IdNumber", "size"),
+        "Jumlah Pelanggan": ("IdNumber", "nunique"),
+        **{col: (col, "sum") for col in kolom_jumlah},
+    }
+    bagian = []
+    for rollup in product([False, True], repeat=len(ROLLUP)):
+        sentinel = {dim: nilai for (dim, nilai), aktif in zip(ROLLUP.items(), rollup) if aktif}
+        bagian.append(detail.assign(**sentinel).groupby(KUNCI_KUBUS, sort=False).agg(**agg))
+
+    kubus = pd.concat(bagian)
+    kubus.index = kubus.index.set_levels(kubus.index.levels[-1].astype(int), level="Kuadran")
+    return kubus.sort_index()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _kubus_versi(versi: str, _df: pd.DataFrame) -> pd.DataFrame:
+    """Kubus per versi data (df tidak di-hash, cukup token versinya)."""
+    return bangun_kubus(_df)
+
+
+def get_kubus(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Kubus agregat untuk `df`, dibangun sekali per versi data
+    (token `VERSI` dari `index_periode`) dan dibagikan ke semua session.
+    """
+    versi = df.attrs.get(VERSI)
+    if versi is None:
+        return bangun_kubus(df)
+    return _kubus_versi(versi, df)
+
+
+def ringkasan_kuadran(kubus: pd.DataFrame, tahun: int, bulan: int = 0, segmen: str = SEMUA, am: str = SEMUA) -> pd.DataFrame:
+    """
+    Ringkasan satu pilihan filter.
+
+    Parameters
+    ----------
+    bulan : int
+        1-12, atau 0 untuk semua bulan.
+    segmen, am : str
+        Nilai filter, atau "-Semua-".
+
+    Returns
+    -------
+    pd.DataFrame
+        Index Kuadran 0-4 (0 = semua kuadran), kolom `UKURAN`.
+        Kombinasi yang tidak ada datanya bernilai 0.
+    """
+    kunci = (int(tahun), int(bulan), segmen, am)
+    try:
+        hasil = kubus.loc[kunci]
+    except KeyError:
+        hasil = kubus.iloc[:0].droplevel(KUNCI_KUBUS[:-1])
+    return hasil.reindex(range(5), fill_value=0)
+
+
+def ringkasan_am(kubus: pd.DataFrame, tahun: int | None = None, bulan: int = 0, segmen: str = SEMUA) -> pd.DataFrame:
+    """
+    Total per AM (semua kuadran) untuk satu pilihan filter.
+
+    Parameters
+    ----------
+    tahun : int, optional
+        None untuk menjumlahkan semua tahun. "Jumlah Pelanggan" lalu berupa
+        jumlah IdNumber unik per tahun.
+
+    Returns
+    -------
+    pd.DataFrame
+        Index AM, kolom `UKURAN`.
+    """
+    semua = slice(None)
+    kunci = (semua if tahun is None else int(tahun), int(bulan), segmen, semua, 0)
+    try:
+        hasil = kubus.loc[kunci, :]
+    except KeyError:
+        hasil = kubus.iloc[:0]
+    hasil = hasil[hasil.index.get_level_values("AM") != SEMUA]
+    return hasil.groupby(level="AM").sum()
@@ -0,0 +1,193 @@
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.schema import VERSI
+
+_BUKAN_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Skor minimal (porsi trigram kata kunci yang ditemukan) supaya pelanggan masuk hasil
+AMBANG_SKOR = 0.4
+
+
+def normalisasi(teks) -> str:
+    """Huruf kecil, selain huruf/angka jadi spasi (mis. "PT. Maju-Jaya" -> "pt maju jaya")."""
+    return _BUKAN_ALNUM.sub(" ", str(teks).lower()).strip()
+
+
+def _unik(arr: np.ndarray) -> np.ndarray:
+    """Nilai unik tersortir (sort + diff, lebih cepat dari np.unique untuk array int besar)."""
+    arr = np.sort(arr)
+    return arr[np.diff(arr, prepend=arr[:1] - 1) != 0]
+
+
+def trigram(teks: str, prefix: bool = False) -> set:
+    """
+    Trigram per kata (teks sudah dinormalisasi), dengan padding seperti pg_trgm:
+    dua spasi di depan & satu di belakang kata.
+
+    Parameters
+    ----------
+    prefix : bool
+        True untuk kata kunci yang sedang diketik: kata terakhir dianggap
+        awalan, jadi tanpa padding belakang ("ma" tetap cocok dengan "maju").
+    """
+    kata = teks.split()
+    hasil = set()
+    for i, k in enumerate(kata):
+        k = f"  {k}" if prefix and i == len(kata) - 1 else f"  {k} "
+        hasil.update(k[j:j + 3] for j in range(len(k) - 2))
+    return hasil
+
+
+class IndeksPelanggan:
+    """
+    Indeks pencarian pelanggan, dibangun sekali per versi data.
+
+    - IdNumber: hash (dict) untuk yang persis sama + array string tersortir untuk awalan
+    - BP Name & AM: inverted index trigram atas teks yang dinormalisasi,
+      jadi salah ketik kecil tetap ketemu (skor = porsi trigram kata kunci yang cocok)
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Database bertipe hasil `index_periode` (periode lama -> baru).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        id_number = df["IdNumber"].to_numpy()
+
+        # Satu baris per pelanggan, data dari periode terbaru
+        terbaru = df.drop_duplicates("IdNumber", keep="last")
+        self.pelanggan = pd.DataFrame({
+            "IdNumber": terbaru["IdNumber"].to_numpy(),
+            "BP Name": terbaru["BP Name"].astype(str).to_numpy(),
+            "AM": terbaru["AM"].astype(str).to_numpy(),
+            "Segmen": terbaru["Segmen"].astype(str).to_numpy(),
+            "Periode Terakhir": terbaru["Bulan Tahun"].astype(str).to_numpy(),
+            "Jumlah Periode": pd.Series(id_number).value_counts().reindex(terbaru["IdNumber"]).to_numpy(),
+        })
+        self._doc = {int(i): n for n, i in enumerate(self.pelanggan["IdNumber"])}
+
+        teks_id = self.pelanggan["IdNumber"].astype(str).to_numpy()
+        self._id_urut = np.argsort(teks_id, kind="stable")
+        self._teks_id = teks_id[self._id_urut]
+
+        # Semua BP Name & AM per pelanggan ikut diindeks, bukan hanya yang terbaru.
+        # Trigram dihitung sekali per teks unik, lalu dipetakan ke pelanggan lewat kode teks.
+        doc = pd.Series(id_number).map(self._doc).to_numpy(dtype=np.int64)
+        kode_bp, teks_bp = pd.factorize(df["BP Name"].astype(str))
+        kode_am, teks_am = pd.factorize(df["AM"].astype(str))
+        pasangan = _unik(np.concatenate([
+            doc * (len(teks_bp) + len(teks_am)) + kode_bp,
+            doc * (len(teks_bp) + len(teks_am)) + len(teks_bp) + kode_am,
+        ]))
+        doc_pasangan, kode_pasangan = np.divmod(pasangan, len(teks_bp) + len(teks_am))
+
+        gram_teks = [trigram(normalisasi(t)) for t in [*teks_bp, *teks_am]]
+        kosakata = sorted(set().union(*gram_teks))
+        kode_gram = {g: i for i, g in enumerate(kosakata)}
+        jumlah = np.array([len(grams) for grams in gram_teks], dtype=np.int64)
+        gram = np.fromiter((kode_gram[g] for grams in gram_teks for g in grams), np.int64, jumlah.sum())
+
+        # Pasangan (doc, teks) -> (doc, trigram): ulangi doc sebanyak trigram teksnya,
+        # lalu ambil potongan `gram` milik teks tersebut (offset CSR)
+        n = jumlah[kode_pasangan]
+        ujung = np.cumsum(n)
+        posisi = np.arange(n.sum()) - np.repeat(ujung - n - (np.cumsum(jumlah) - jumlah)[kode_pasangan], n)
+        postings_gram, postings_doc = gram[posisi], np.repeat(doc_pasangan, n)
+        kunci = _unik(postings_gram * len(self.pelanggan) + postings_doc)
+        kode, docs = np.divmod(kunci, len(self.pelanggan))
+        awal = np.flatnonzero(np.diff(kode, prepend=-1))
+        self._postings = dict(zip(np.array(kosakata)[kode[awal]], np.split(docs, awal[1:])))
+        self._teks = (self.pelanggan["BP Name"] + " " + self.pelanggan["AM"]).map(normalisasi).to_numpy()
+
+    def cari(self, kata_kunci: str, batas: int = 20) -> pd.DataFrame:
+        """
+        Cari pelanggan lewat IdNumber (persis / awalan), BP Name atau AM (fuzzy).
+
+        Returns
+        -------
+        pd.DataFrame
+            Maks. `batas` pelanggan, urut dari yang paling cocok:
+            IdNumber persis, awalan IdNumber, lalu skor trigram
+            (kata kunci yang muncul utuh di teks didahulukan).
+        """
+        q = normalisasi(kata_kunci)
+        skor = np.zeros(len(self.pelanggan))
+        if not q:
+            return self.pelanggan.iloc[:0]
+
+        if q.isdigit():
+            kiri, kanan = np.searchsorted(self._teks_id, [q, q + "\uffff"])
+            skor[self._id_urut[kiri:kanan][:batas]] = 3
+            if int(q) in self._doc:
+                skor[self._doc[int(q)]] = 4
+
+        grams = trigram(q, prefix=True)
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        if postings:
+            cocok = np.bincount(np.concatenate(postings), minlength=len(skor)) / len(grams)
+            kandidat = np.flatnonzero((cocok >= AMBANG_SKOR) & (skor == 0))
+            if len(kandidat) > batas * 10:
+                kandidat = kandidat[np.argpartition(-cocok[kandidat], batas * 10)[:batas * 10]]
+            utuh = np.fromiter((q in self._teks[i] for i in kandidat), bool, len(kandidat))
+            skor[kandidat] = cocok[kandidat] + utuh
+
+        hasil = np.flatnonzero(skor)
+        hasil = hasil[np.lexsort((self.pelanggan["BP Name"].to_numpy()[hasil], -skor[hasil]))][:batas]
+        return self.pelanggan.iloc[hasil].reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _indeks_versi(versi: str, _df: pd.DataFrame) -> IndeksPelanggan:
+    """Indeks per versi data (df tidak di-hash, cukup token versinya)."""
+    return IndeksPelanggan(_df)
+
+
+def get_indeks_pelanggan(df: pd.DataFrame) -> IndeksPelanggan:
+    """
+    Indeks pencarian untuk `df`, dibangun sekali per versi data
+    (token `VERSI` dari `index_periode`) dan dibagikan ke semua session.
+    """
+    versi = df.attrs.get(VERSI)
+    if versi is None:
+        return IndeksPelanggan(df)
+    return _indeks_versi(versi, df)
+
+
+def urutan_id(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Offset riwayat pelanggan: posisi baris `df` diurutkan per IdNumber.
+    `df` hasil `index_periode` sudah urut periode, jadi sort stabil membuat
+    baris satu pelanggan bersebelahan & tetap urut periode.
+
+    Returns
+    -------
+    tuple
+        (posisi baris, IdNumber tersortir) untuk `np.searchsorted`.
+    """
+    id_number = df["IdNumber"].to_numpy()
+    urut = np.argsort(id_number, kind="stable")
+    return urut, id_number[urut]
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _urutan_id_versi(versi: str, _df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Offset riwayat per versi data (df tidak di-hash, cukup token versinya)."""
+    return urutan_id(_df)
+
+
+def riwayat_pelanggan(df: pd.DataFrame, id_number) -> pd.DataFrame:
+    """
+    Semua baris satu pelanggan di seluruh periode, urut dari periode terlama.
+    Diambil sebagai potongan dari offset `urutan_id` (dibangun sekali per versi data),
+    bukan mask atas semua baris.
+    """
+    versi = df.attrs.get(VERSI)
+    urut, id_urut = urutan_id(df) if versi is None else _urutan_id_versi(versi, df)
+    kiri = np.searchsorted(id_urut, int(id_number), side="left")
+    kanan = np.searchsorted(id_urut, int(id_number), side="right")
+    return df.iloc[urut[kiri:kanan]]
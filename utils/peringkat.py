@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.schema import VERSI
+
+KUADRAN = range(1, 5)
+
+
+def _urutan(df: pd.DataFrame) -> dict:
+    kuadran = df["Kuadran"].fillna(0).to_numpy(dtype=np.int64)
+    saldo = df["Saldo Akhir"].to_numpy(dtype=float)
+
+    # Satu partisi per Kuadran (sort stabil kunci int kecil), lalu tiap potongan
+    # diurutkan Saldo Akhir turun; tidak ada salinan DataFrame per kuadran
+    urut = np.argsort(kuadran, kind="stable")
+    batas = np.searchsorted(kuadran[urut], [*KUADRAN, KUADRAN[-1] + 1])
+    hasil = {}
+    for i, q in enumerate(KUADRAN):
+        posisi = urut[batas[i]:batas[i + 1]]
+        hasil[q] = posisi[np.argsort(-saldo[posisi], kind="stable")]
+    return hasil
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _urutan_versi(versi: str, kunci: tuple, n_baris: int, _df: pd.DataFrame) -> dict:
+    """Urutan per versi data & pilihan filter (df tidak di-hash, jumlah baris sebagai pengaman)."""
+    return _urutan(_df)
+
+
+def urutan_kuadran(df: pd.DataFrame, kunci: tuple = ()) -> dict:
+    """
+    Posisi baris (`iloc`) tiap Kuadran 1-4, urut dari Saldo Akhir terbesar.
+    Top-k kuadran = `k` posisi pertama, tabel lengkap = semua posisinya,
+    jadi tidak perlu mask & sort ulang per kuadran.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data yang sudah difilter (turunan `index_periode`, membawa token `VERSI`).
+    kunci : tuple
+        Pilihan filter yang menghasilkan `df` (mis. (bulan, tahun, segmen)),
+        ikut jadi kunci cache bersama token versi data.
+
+    Returns
+    -------
+    dict
+        Kuadran -> np.ndarray posisi baris.
+    """
+    versi = df.attrs.get(VERSI)
+    if versi is None:
+        return _urutan(df)
+    return _urutan_versi(versi, kunci, len(df), df)
+
+
+def _urutan_kolom(df: pd.DataFrame, posisi: np.ndarray, kolom: str, naik: bool) -> np.ndarray:
+    nilai = df[kolom].iloc[posisi].reset_index(drop=True)
+    return posisi[nilai.sort_values(ascending=naik, kind="stable", na_position="last").index.to_numpy()]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _urutan_kolom_versi(versi: str, kunci: tuple, kolom: str, naik: bool, n_baris: int, _df: pd.DataFrame, _posisi: np.ndarray) -> np.ndarray:
+    """Urutan per versi data, pilihan filter & kolom (df & posisi tidak di-hash)."""
+    return _urutan_kolom(_df, _posisi, kolom, naik)
+
+
+def urutan_kolom(df: pd.DataFrame, posisi: np.ndarray, kolom: str, naik: bool = False, kunci: tuple = ()) -> np.ndarray:
+    """
+    Urutkan posisi baris (`iloc`) berdasarkan satu kolom, tanpa menyalin DataFrame.
+
+    Parameters
+    ----------
+    posisi : np.ndarray
+        Posisi baris yang diurutkan (mis. satu kuadran dari `urutan_kuadran`).
+    kunci : tuple
+        Identitas `df` & `posisi` (pilihan filter, tabel), ikut jadi kunci cache
+        bersama token versi data; lihat `urutan_kuadran`.
+
+    Returns
+    -------
+    np.ndarray
+        `posisi` yang sudah diurutkan (nilai kosong di akhir).
+    """
+    versi = df.attrs.get(VERSI)
+    if versi is None:
+        return _urutan_kolom(df, posisi, kolom, naik)
+    return _urutan_kolom_versi(versi, kunci, kolom, naik, len(posisi), df, posisi)
@@ -0,0 +1,136 @@
+import time
+import random
+import threading
+from collections import Counter
+from http import HTTPStatus
+
+import streamlit as st
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+# Kuota default Google Sheets API per menit (per project/user). Sesuaikan kalau
+# kuota project di Google Cloud Console dinaikkan.
+REQUESTS_PER_MINUTE = 60
+
+# Backoff eksponensial untuk error kuota/server: 1, 2, 4, ... detik (maks 32) + jitter
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 32.0
+
+_RETRY_CODES = {HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.REQUEST_TIMEOUT}
+
+# Request tulis yang tidak idempoten (insert/delete baris, append, add sheet): bisa saja
+# sudah diterapkan server walau jawabannya 5xx/408, jadi hanya di-retry kalau ditolak kuota
+_TIDAK_IDEMPOTEN = (":batchUpdate", ":append")
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe. Kapasitas = kuota per menit, diisi ulang merata
+    setiap detik, jadi burst request diantrekan alih-alih ditolak Google.
+    """
+
+    def __init__(self, capacity: int, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Ambil satu token, tunggu kalau habis. Return lama menunggu (detik)."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.refill_per_second
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.refill_per_second
+            time.sleep(delay)
+            waited += delay
+
+
+@st.cache_resource
+def _get_bucket() -> TokenBucket:
+    """Satu bucket per proses, dipakai bersama oleh semua session."""
+    return TokenBucket(REQUESTS_PER_MINUTE, REQUESTS_PER_MINUTE / 60)
+
+
+@st.cache_resource
+def _get_stats() -> tuple[Counter, threading.Lock]:
+    return Counter(), threading.Lock()
+
+
+def _count(**increments) -> None:
+    stats, lock = _get_stats()
+    with lock:
+        stats.update(increments)
+
+
+def get_request_stats() -> dict:
+    """
+    Statistik request Google Sheets sejak proses dimulai.
+
+    Returns
+    -------
+    dict
+        - requests      : jumlah request HTTP yang dikirim (termasuk retry)
+        - retries       : jumlah retry karena kuota/error server
+        - failures      : request yang tetap gagal setelah retry habis / error lain
+        - throttled     : request yang harus menunggu token bucket
+        - wait_seconds  : total waktu menunggu (token bucket + backoff)
+        - status_<kode> : jumlah error per kode HTTP
+    """
+    stats, lock = _get_stats()
+    with lock:
+        return dict(stats)
+
+
+def _idempoten(method: str, endpoint: str) -> bool:
+    """False untuk POST `:batchUpdate` / `:append` (termasuk add sheet, lewat batchUpdate)."""
+    return not (method.lower() == "post" and endpoint.split("?")[0].endswith(_TIDAK_IDEMPOTEN))
+
+
+def _should_retry(err: APIError, idempoten: bool = True) -> bool:
+    """
+    Retry untuk 429 dan 403 karena batas pemakaian (usageLimits): request ditolak
+    sebelum diproses. 408/5xx hanya di-retry untuk request idempoten (baca, tulis nilai).
+    """
+    if err.code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    if err.code == HTTPStatus.FORBIDDEN:
+        reasons = [e.get("domain") for e in err.error.get("errors", [])]
+        return "usageLimits" in reasons
+    return idempoten and (err.code in _RETRY_CODES or err.code >= HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+class QuotaHTTPClient(HTTPClient):
+    """
+    HTTP client gspread yang melewatkan semua request lewat token bucket
+    (sesuai kuota per menit) dan backoff eksponensial dengan jitter.
+    Dipasang di `get_client`, jadi semua pemanggilan gspread otomatis ikut.
+    """
+
+    def request(self, method, endpoint, *args, **kwargs):
+        bucket = _get_bucket()
+        idempoten = _idempoten(method, endpoint)
+        for attempt in range(MAX_RETRIES + 1):
+            waited = bucket.acquire()
+            _count(requests=1, throttled=int(waited > 0), wait_seconds=waited)
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except APIError as err:
+                _count(**{f"status_{err.code}": 1})
+                if attempt == MAX_RETRIES or not _should_retry(err, idempoten):
+                    _count(failures=1)
+                    raise
+                delay = min(MAX_DELAY, BASE_DELAY * 2 ** attempt)
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                _count(retries=1, wait_seconds=delay)
+                time.sleep(delay)
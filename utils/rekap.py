@@ -0,0 +1,72 @@
+import pandas as pd
+
+from utils.kubus import UKURAN
+from utils.schema import AGING_COLS, REKAP_SCHEMA, SEMUA, filter_periode
+from utils.snapshot import partition_key, partition_sort_key
+
+# Worksheet ringkasan yang ditulis bersama DATABASE (lihat services.update_rekap)
+REKAP_SHEET = "REKAP"
+
+KUNCI_REKAP = ["Bulan Tahun", "Segmen", "Kuadran", "AM"]
+REKAP_COLS = list(REKAP_SCHEMA)
+
+
+def bangun_rekap(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Baris worksheet REKAP dari data detail bertipe (satu atau beberapa partisi).
+    Hanya Saldo Akhir > 0 yang dihitung, sama seperti `utils.kubus.bangun_kubus`;
+    baris tanpa Kuadran tetap direkap dengan Kuadran kosong.
+
+    Returns
+    -------
+    pd.DataFrame
+        Kolom `REKAP_COLS`, satu baris per (Bulan Tahun, Segmen, Kuadran, AM).
+    """
+    df = df[df["Saldo Akhir"] > 0]
+    kolom_jumlah = [col for col in ["Saldo Akhir", *AGING_COLS] if col in df.columns]
+    rekap = (
+        df.assign(**{col: df[col].astype(str) for col in ["Bulan Tahun", "Segmen", "AM"]})
+        .groupby(KUNCI_REKAP, dropna=False, sort=False)
+        .agg(**{
+            "Jumlah Baris": ("IdNumber", "size"),
+            "Jumlah Pelanggan": ("IdNumber", "nunique"),
+            **{col: (col, "sum") for col in kolom_jumlah},
+        })
+        .reset_index()
+    )
+    return rekap.reindex(columns=REKAP_COLS, fill_value=0)
+
+
+def urutkan_rekap(rekap: pd.DataFrame) -> pd.DataFrame:
+    """Urutan baris REKAP mengikuti DATABASE (Bulan Tahun terbaru, Segmen A-Z), lalu Kuadran & AM."""
+    partisi = [partition_sort_key(partition_key(b, s)) for b, s in zip(rekap["Bulan Tahun"], rekap["Segmen"])]
+    return (
+        rekap.assign(_partisi=partisi)
+        .sort_values(["_partisi", "Kuadran", "AM"], na_position="last", kind="stable")
+        .drop(columns="_partisi")
+        .reset_index(drop=True)
+    )
+
+
+def ringkasan_rekap(rekap: pd.DataFrame, tahun: int, bulan: int = 0, segmen: str = SEMUA) -> pd.DataFrame:
+    """
+    Sama seperti `utils.kubus.ringkasan_kuadran` (semua AM), tapi dari REKAP
+    yang sudah diindeks `index_periode`. "Jumlah Pelanggan" dijumlahkan antar
+    partisi, jadi untuk banyak bulan/segmen nilainya bisa lebih besar dari IdNumber unik.
+
+    Returns
+    -------
+    pd.DataFrame
+        Index Kuadran 0-4 (0 = semua kuadran), kolom `UKURAN`.
+    """
+    bagian = filter_periode(rekap, bulan, tahun, segmen)
+    per_kuadran = bagian.groupby("Kuadran")[UKURAN].sum().reindex(range(1, 5), fill_value=0)
+    total = bagian[UKURAN].sum().to_frame(0).T
+    hasil = pd.concat([total, per_kuadran])
+    hasil.index = pd.RangeIndex(5, name="Kuadran")
+    return hasil
+
+
+def rekap_per_am(rekap: pd.DataFrame) -> pd.DataFrame:
+    """Total per AM untuk seluruh periode & segmen di REKAP."""
+    return rekap.groupby("AM")[UKURAN].sum()
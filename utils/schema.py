@@ -0,0 +1,256 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Bentuk angka yang sah setelah dibersihkan, mis. "-1234", "1234.5", ".5"
+_POLA_ANGKA = r"^-?(\d+\.?\d*|\.\d+)$"
+
+
+def _ada(arr: pa.Array, teks: str) -> pa.Array:
+    """Mask sel yang mengandung `teks`."""
+    return pc.match_substring(arr, teks)
+
+
+def _buang(arr: pa.Array, teks: str) -> pa.Array:
+    """Hapus `teks` dari semua sel (dilewati kalau tidak ada yang mengandungnya)."""
+    if pc.any(_ada(arr, teks)).as_py():
+        return pc.replace_substring(arr, teks, "")
+    return arr
+
+
+def _to_series(arr: pa.Array, like: pd.Series) -> pd.Series:
+    return pd.Series(arr.to_numpy(zero_copy_only=False), index=like.index, name=like.name)
+
+
+def parse_angka(series: pd.Series) -> pd.Series:
+    """
+    Parser angka tunggal untuk semua data (dipakai juga oleh `cast_to_number`).
+    Versi vektor (pyarrow.compute) dari aturan per sel:
+    - kosong / "nan" / "None" -> 0
+    - ada "(" dan ")" -> negatif
+    - buang Rp & spasi
+    - ada koma dan titik (123.456,78) -> titik dibuang, koma jadi desimal
+    - selain itu koma & titik dianggap pemisah ribuan -> dibuang
+    - buang karakter selain digit, titik & minus; yang tetap bukan angka -> 0
+
+    Returns
+    -------
+    pd.Series
+        int64 kalau semua bilangan bulat, selain itu float64 (sama seperti pd.to_numeric).
+    """
+    s = pc.utf8_trim_whitespace(pa.array(series.astype(str).to_numpy(), type=pa.string()))
+
+    # Jalur cepat: semua sel sudah berupa bilangan bulat (cek murah dulu,
+    # karena cast yang gagal tetap membaca seluruh kolom)
+    if pc.all(pc.utf8_is_decimal(pc.utf8_ltrim(s, characters="+-")), min_count=0).as_py():
+        try:
+            return _to_series(pc.cast(s, pa.int64()), series)
+        except pa.ArrowInvalid:
+            pass
+
+    kosong = pc.is_in(s, value_set=pa.array(["", "nan", "None"]))
+    negatif = pc.and_(_ada(s, "("), _ada(s, ")"))
+    ada_negatif = pc.any(negatif).as_py()
+
+    # Kurung, Rp & spasi tidak memengaruhi aturan koma/titik, jadi boleh dibuang duluan
+    for teks in ("(", ")", "Rp", " "):
+        s = _buang(s, teks)
+
+    koma_desimal = pc.and_(_ada(s, ","), _ada(s, "."))
+    if pc.any(koma_desimal).as_py():
+        s = pc.if_else(
+            koma_desimal,
+            pc.replace_substring(pc.replace_substring(s, ".", ""), ",", "."),
+            _buang(_buang(s, ","), "."),
+        )
+    else:
+        s = _buang(_buang(s, ","), ".")
+
+    valid = pc.match_substring_regex(s, _POLA_ANGKA)
+    if not pc.all(valid).as_py():
+        s = pc.replace_substring_regex(s, r"[^\d\.\-]", "")
+        valid = pc.match_substring_regex(s, _POLA_ANGKA)
+
+    if ada_negatif:
+        s = pc.if_else(
+            pc.and_(negatif, pc.invert(pc.starts_with(s, "-"))),
+            pc.binary_join_element_wise("-", s, ""),
+            s
+        )
+
+    valid = pc.or_(valid, kosong)
+    s = pc.if_else(pc.and_(valid, pc.invert(kosong)), s, "0")
+
+    if pc.all(valid).as_py() and not pc.any(_ada(s, ".")).as_py():
+        try:
+            return _to_series(pc.cast(s, pa.int64()), series)
+        except pa.ArrowInvalid:
+            pass
+    return _to_series(pc.cast(s, pa.float64()), series)
+
+
+def parse_teks(series: pd.Series) -> pd.Series:
+    """Kolom teks: sel kosong/NaN jadi string kosong."""
+    return series.fillna("").astype(str)
+
+
+def parse_kode(series: pd.Series) -> pd.Series:
+    """Kolom kode (mis. Kuadran): bukan angka jadi NA, bukan 0."""
+    return pd.to_numeric(series, errors="coerce")
+
+
+def parse_nilai(series: pd.Series) -> pd.Series:
+    """Kolom angka yang dibaca UNFORMATTED_VALUE (sel sudah berupa angka): kosong -> 0."""
+    return pd.to_numeric(series, errors="coerce").fillna(0)
+
+
+# Aturan parse yang bisa dipakai di skema
+PARSERS = {
+    "teks": parse_teks,
+    "angka": parse_angka,
+    "kode": parse_kode,
+    "nilai": parse_nilai,
+}
+
+AGING_COLS = ["0-3 Bulan", "4-6 Bulan", "7-12 Bulan", "13-24 Bulan", "> 24 Bulan"]
+
+# Skema worksheet DATABASE: kolom -> (aturan parse, dtype hasil)
+DATABASE_SCHEMA = {
+    "Bulan Tahun":    ("teks", "object"),
+    "Segmen":         ("teks", "object"),
+    "IdNumber":       ("angka", "int64"),
+    "BP Name":        ("teks", "object"),
+    "AM":             ("teks", "object"),
+    **{col: ("angka", "float64") for col in AGING_COLS},
+    "Saldo Akhir":    ("angka", "float64"),
+    "Keterangan":     ("teks", "object"),
+    "Lama Tunggakan": ("angka", "int64"),
+    "Kuadran":        ("kode", "Int64"),
+    "Last Updated":   ("teks", "object"),
+}
+
+# Skema worksheet "Batas Kuadran"
+BATAS_KUADRAN_SCHEMA = {
+    "Segmen":              ("teks", "object"),
+    "Batas Nominal":       ("angka", "float64"),
+    "Batas Waktu (bulan)": ("angka", "float64"),
+}
+
+# Skema worksheet REKAP (ringkasan per Bulan Tahun, Segmen, Kuadran, AM; lihat utils.rekap).
+# Ditulis & dibaca sebagai nilai mentah (UNFORMATTED_VALUE), jadi angka tidak perlu di-parse dari teks.
+REKAP_SCHEMA = {
+    "Bulan Tahun":      ("teks", "object"),
+    "Segmen":           ("teks", "object"),
+    "Kuadran":          ("kode", "Int64"),
+    "AM":               ("teks", "object"),
+    "Jumlah Baris":     ("nilai", "int64"),
+    "Jumlah Pelanggan": ("nilai", "int64"),
+    "Saldo Akhir":      ("nilai", "float64"),
+    **{col: ("nilai", "float64") for col in AGING_COLS},
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: dict = DATABASE_SCHEMA) -> pd.DataFrame:
+    """
+    Ubah DataFrame mentah (string dari Google Sheets) menjadi DataFrame bertipe
+    sesuai skema. Dipanggil sekali saat data dimuat, jadi halaman tidak perlu
+    parse ulang.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data mentah. Kolom yang tidak ada di skema dibiarkan apa adanya,
+        kolom skema yang tidak ada di `df` dilewati.
+    schema : dict
+        Kolom -> (aturan parse di `PARSERS`, dtype).
+
+    Returns
+    -------
+    pd.DataFrame
+        Salinan `df` dengan kolom sudah bertipe.
+    """
+    df = df.copy()
+    for col, (aturan, dtype) in schema.items():
+        if col in df.columns:
+            df[col] = PARSERS[aturan](df[col]).astype(dtype)
+    return df
+
+
+# Nomor baris asli di Google Sheet (frame database disortir ulang oleh index_periode)
+BARIS_SHEET = "Baris Sheet"
+
+# Pilihan filter "semua" (segmen, AM, ...) di seluruh halaman
+SEMUA = "-Semua-"
+
+# Kunci `df.attrs` berisi token versi data, diganti setiap kali data dimuat ulang
+VERSI = "versi"
+
+# Level index periode & kolom teks berulang yang disimpan sebagai kategori
+PERIODE_LEVELS = ["tahun", "bulan", "segmen"]
+KOLOM_KATEGORI = ["Segmen", "AM", "Bulan Tahun"]
+
+
+def index_periode(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Siapkan DataFrame database untuk filter periode yang cepat:
+    - "Bulan Tahun" di-parse sekali (per nilai unik) jadi level `bulan` & `tahun` (int)
+    - Segmen, AM & Bulan Tahun disimpan sebagai kategori
+    - index: MultiIndex tersortir (tahun, bulan, segmen)
+    - kolom `BARIS_SHEET` menyimpan nomor baris sheet (dari index lama kalau belum ada)
+    - `df.attrs[VERSI]`: token versi baru, kunci cache turunan (mis. `utils.kubus`)
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame baru yang sudah diindeks; filter lewat `filter_periode`.
+    """
+    baris = df[BARIS_SHEET].to_numpy() if BARIS_SHEET in df.columns else np.arange(len(df)) + 2
+
+    bulan_tahun = df["Bulan Tahun"].astype("category")
+    bagian = (
+        bulan_tahun.cat.categories.to_series()
+        .str.split("/", n=1, expand=True)
+        .reindex(columns=[0, 1])
+    )
+    # Nilai per kategori + 0 di ujung, supaya code -1 (NaN) jatuh ke 0
+    codes = bulan_tahun.cat.codes.to_numpy()
+    bulan, tahun = (
+        np.append(pd.to_numeric(bagian[i], errors="coerce").fillna(0).astype(int).to_numpy(), 0)[codes]
+        for i in (0, 1)
+    )
+
+    df = df.assign(**{
+        col: df[col].astype("category") for col in KOLOM_KATEGORI if col in df.columns
+    })
+    df[BARIS_SHEET] = baris
+    df.index = pd.MultiIndex.from_arrays(
+        [tahun, bulan, df["Segmen"].astype(str).to_numpy()], names=PERIODE_LEVELS
+    )
+    df = df.sort_index(kind="stable")
+    df.attrs[VERSI] = uuid.uuid4().hex
+    return df
+
+
+def filter_periode(df: pd.DataFrame, bulan: int = 0, tahun: int | None = None, segmen: str | None = None) -> pd.DataFrame:
+    """
+    Ambil baris satu periode lewat slice index (hasil `index_periode`), bukan scan string.
+
+    Parameters
+    ----------
+    bulan : int
+        1-12, atau 0 untuk semua bulan.
+    tahun : int, optional
+        Tahun; None untuk semua tahun.
+    segmen : str, optional
+        Segmen; None / "-Semua-" untuk semua segmen.
+    """
+    semua = slice(None)
+    key = (
+        semua if tahun is None else slice(int(tahun), int(tahun)),
+        semua if not bulan else slice(int(bulan), int(bulan)),
+        semua if segmen in (None, SEMUA) else slice(segmen, segmen),
+    )
+    return df.loc[key, :]
@@ -1,13 +1,27 @@
 import streamlit as st
 import gspread
+import numpy as np
 import pandas as pd
 from google.oauth2.service_account import Credentials
+from gspread.utils import ValueInputOption, ValueRenderOption, absolute_range_name, fill_gaps, rowcol_to_a1
 from gspread_dataframe import set_with_dataframe
+from utils.quota import QuotaHTTPClient
+from utils.schema import apply_schema, index_periode, BARIS_SHEET, REKAP_SCHEMA, VERSI
+from utils.snapshot import (
+    sync_snapshot, invalidate_snapshot_partitions,
+    partition_key, partition_sort_key, read_period_index, scan_period_index, scan_partition_rows,
+    PARTITION_COLS, VERSION_COL
+)
+from utils.rekap import REKAP_SHEET, REKAP_COLS, bangun_rekap, urutkan_rekap
+
+# Umur cache data sheet (detik) yang dibagikan ke semua session
+CACHE_TTL = 600
 
 @st.cache_resource
 def get_client():
     """
     Create and return an authenticated Google Sheets client using gspread.
+    Every request goes through `QuotaHTTPClient` (token bucket + retry/backoff).
     Return:
     -------
     gspread.Client
@@ -18,15 +32,46 @@ def get_client():
         st.secrets["gcp_service_account"],
         scopes=["https://www.googleapis.com/auth/spreadsheets"]
     )
-    return gspread.authorize(creds)
+    return gspread.authorize(creds, http_client=QuotaHTTPClient)
 
 
-def get_worksheet(link_spreadsheet=None, nama_worksheet="DATABASE"):
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def get_spreadsheet(link_spreadsheet):
+    """
+    Ambil handle Spreadsheet (satu request metadata), dibagikan ke semua session.
+    Param:
+        - link_spreadsheet (str): URL Spreadsheet
+    Return:
+        - gspread.Spreadsheet
+    """
+    return get_client().open_by_url(link_spreadsheet)
+
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def _worksheet_handles(link_spreadsheet):
+    """
+    Ambil handle semua worksheet sekaligus (satu request metadata),
+    dipetakan berdasarkan nama tab.
+    """
+    return {ws.title: ws for ws in get_spreadsheet(link_spreadsheet).worksheets()}
+
+
+def invalidate_worksheet_handles(link_spreadsheet):
+    """Buang cache handle spreadsheet & worksheet untuk satu URL."""
+    get_spreadsheet.clear(link_spreadsheet)
+    _worksheet_handles.clear(link_spreadsheet)
+
+
+def get_worksheet(link_spreadsheet=None, nama_worksheet="DATABASE", refresh=False):
     """
     Ambil worksheet tertentu dari Google Spreadsheet.
+    Handle diambil dari cache (per URL & nama tab), jadi tidak ada request
+    metadata selama worksheet tidak berubah.
     Param:
         - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
         - nama_worksheet (str): nama tab worksheet (default "DATABASE")
+        - refresh (bool): muat ulang metadata dulu. Dipakai sebelum menulis,
+          karena operasi tulis memakai sheetId yang bisa basi kalau tab di-rename/dihapus.
     Return:
         - worksheet object
     """
@@ -37,24 +82,288 @@ def get_worksheet(link_spreadsheet=None, nama_worksheet="DATABASE"):
 
     if not link_spreadsheet:
         raise ValueError("❌ Link spreadsheet tidak ditemukan.")
-    
-    client = get_client()
-    return client.open_by_url(link_spreadsheet).worksheet(nama_worksheet)
+
+    if refresh:
+        invalidate_worksheet_handles(link_spreadsheet)
+
+    handles = _worksheet_handles(link_spreadsheet)
+    if nama_worksheet not in handles and not refresh:
+        # Bisa jadi tab baru dibuat/di-rename setelah handle di-cache
+        invalidate_worksheet_handles(link_spreadsheet)
+        handles = _worksheet_handles(link_spreadsheet)
+
+    if nama_worksheet not in handles:
+        raise gspread.exceptions.WorksheetNotFound(nama_worksheet)
+    return handles[nama_worksheet]
+
+
+def _with_worksheet(link_spreadsheet, nama_worksheet, fn):
+    """
+    Jalankan fn(worksheet) dengan handle dari cache. Kalau Sheets menolak
+    range-nya (400, tab sudah di-rename/dihapus), muat ulang handle lalu coba sekali lagi.
+    """
+    try:
+        return fn(get_worksheet(link_spreadsheet, nama_worksheet))
+    except gspread.exceptions.APIError as e:
+        if e.code != 400:
+            raise
+        return fn(get_worksheet(link_spreadsheet, nama_worksheet, refresh=True))
+
+
+def _resolve_sheet(link_spreadsheet=None, nama_worksheet="DATABASE"):
+    """
+    Lengkapi URL & nama worksheet dengan default dari st.session_state,
+    supaya kunci cache selalu berupa nilai konkret.
+    """
+    if link_spreadsheet is None:
+        link_spreadsheet = st.session_state.get("database_gsheet_url", "")
+    if nama_worksheet is None:
+        nama_worksheet = st.session_state.get("database_sheet_name", "DATABASE")
+    return link_spreadsheet, nama_worksheet
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_all_values(link_spreadsheet, nama_worksheet):
+    """
+    Ambil semua nilai worksheet. Hasilnya dibagikan ke semua session
+    (kunci: URL spreadsheet + nama worksheet) selama `CACHE_TTL` detik.
+    """
+    return _with_worksheet(
+        link_spreadsheet, nama_worksheet, lambda ws: ws.get_all_values()
+    )
+
+
+def _hanya_baca(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tandai semua array di balik frame bersama (cache_resource) read-only.
+    Session hanya memegang view dangkalnya, jadi tulis in-place ke view
+    (mis. `df.loc[mask, "Kuadran"] = ...`) gagal dengan ValueError, bukan diam-diam
+    mengubah data semua session. Salin dulu (`df.copy()`) sebelum mengubah isi.
+    """
+    # Gabungkan blok dulu, supaya pandas tidak menggantinya nanti dengan array baru yang bisa ditulis
+    df._consolidate_inplace()
+    for arr in df._mgr.arrays:
+        # ndarray biasa, atau isi extension array (kode Categorical, data & mask Int64)
+        for bagian in (arr, getattr(arr, "_ndarray", None), getattr(arr, "_data", None), getattr(arr, "_mask", None)):
+            if isinstance(bagian, np.ndarray):
+                bagian.flags.writeable = False
+    return df
+
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_database(link_spreadsheet, nama_worksheet):
+    """
+    Muat worksheet DATABASE lewat snapshot Parquet lokal yang disinkron
+    per partisi (lihat `utils.snapshot.sync_snapshot`), dibagikan ke semua session.
+    Tipe kolom & index periode diterapkan sekali di sini
+    (lihat `utils.schema.DATABASE_SCHEMA` dan `utils.schema.index_periode`).
+    Satu objek read-only per proses (tanpa pickle per pemanggilan, lihat `_hanya_baca`);
+    ambil lewat `get_database`.
+    """
+    df = _with_worksheet(
+        link_spreadsheet, nama_worksheet,
+        lambda ws: sync_snapshot(ws, link_spreadsheet, nama_worksheet)
+    )
+    return _hanya_baca(index_periode(apply_schema(df)))
 
 
-def get_raw_values(link_spreadsheet=None, nama_worksheet="DATABASE"):
+def get_database(link_spreadsheet=None, nama_worksheet=None):
+    """
+    Ambil seluruh isi worksheet DATABASE, kolom sudah bertipe sesuai skema.
+    Param:
+        - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
+        - nama_worksheet (str): nama tab worksheet (default ambil dari st.session_state)
+    Return:
+        - DataFrame diindeks (tahun, bulan, segmen) lewat `utils.schema.index_periode`;
+          nomor baris sheet ada di kolom "Baris Sheet".
+          View dangkal read-only atas frame bersama (tanpa menyalin data), token versi
+          ikut terbawa. Salin dulu (`df.copy()`) sebelum mengubah isinya.
+    """
+    link_spreadsheet, nama_worksheet = _resolve_sheet(link_spreadsheet, nama_worksheet)
+    if not link_spreadsheet:
+        raise ValueError("❌ Link spreadsheet tidak ditemukan.")
+    return _fetch_database(link_spreadsheet, nama_worksheet).copy(deep=False)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _clean_versi(versi: str, _df: pd.DataFrame) -> pd.DataFrame:
+    """Database tanpa Saldo Akhir 0 / minus per versi data (df tidak di-hash, cukup token versinya)."""
+    return _hanya_baca(_df.query("`Saldo Akhir` > 0"))
+
+
+@st.cache_resource
+def _cache_registry():
+    """
+    Catatan entri cache turunan (batch range, data per periode) per (URL, nama worksheet),
+    berisi pasangan (fungsi cache, argumen). Dipakai supaya invalidasi satu worksheet
+    hanya membuang entri yang memuatnya.
+    """
+    return {}
+
+
+def _register_cache(link_spreadsheet, nama_worksheet, cached_fn, *args):
+    _cache_registry().setdefault((link_spreadsheet, nama_worksheet), set()).add((cached_fn, args))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_many_values(link_spreadsheet, ranges):
+    """Ambil banyak range sekaligus dengan satu request values_batch_get."""
+    response = get_spreadsheet(link_spreadsheet).values_batch_get(list(ranges))
+    return [vr.get("values", []) for vr in response.get("valueRanges", [])]
+
+
+def _sheet_of_range(range_name):
+    """Nama worksheet dari range A1 absolut, mis. "'DATA COLLECTION CR'!A1:F" -> DATA COLLECTION CR."""
+    sheet = range_name.rsplit("!", 1)[0] if "!" in range_name else range_name
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet
+
+
+def get_many_values(ranges, link_spreadsheet=None):
+    """
+    Ambil beberapa worksheet/range dari satu spreadsheet dalam satu request.
+    Param:
+        - ranges (list[str]): nama worksheet (ambil seluruh isi tab) atau range A1
+          lengkap dengan nama tab, mis. "'Batas Kuadran'!A1:C"
+        - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
+    Return:
+        - list DataFrame (header = baris pertama range), urutan sama dengan `ranges`
+    """
+    link_spreadsheet, _ = _resolve_sheet(link_spreadsheet, None)
+    if not link_spreadsheet:
+        raise ValueError("❌ Link spreadsheet tidak ditemukan.")
+
+    ranges = tuple(r if "!" in r else absolute_range_name(r) for r in ranges)
+    for r in ranges:
+        _register_cache(link_spreadsheet, _sheet_of_range(r), _fetch_many_values, ranges)
+
+    dfs = []
+    for values in _fetch_many_values(link_spreadsheet, ranges):
+        if not values:
+            dfs.append(pd.DataFrame())
+            continue
+        values = fill_gaps(values)
+        dfs.append(pd.DataFrame(values[1:], columns=values[0]))
+    return dfs
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_header(link_spreadsheet, nama_worksheet):
+    """Ambil baris header (baris 1) worksheet."""
+    return _with_worksheet(
+        link_spreadsheet, nama_worksheet, lambda ws: ws.row_values(1)
+    )
+
+
+def _period_ranges(index, bulan, segmen):
+    """
+    Rentang baris sheet untuk satu bulan (semua segmen kalau segmen None/"-Semua-").
+    Return list (segmen, baris pertama, baris terakhir, jumlah baris).
+    """
+    if segmen in (None, "-Semua-"):
+        prefix = partition_key(bulan, "")
+        return [
+            (key[len(prefix):], *rng) for key, rng in index.items()
+            if key.startswith(prefix)
+        ]
+    rng = index.get(partition_key(bulan, segmen))
+    return [(segmen, *rng)] if rng else []
+
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_period_values(link_spreadsheet, nama_worksheet, bulan, segmen):
+    """
+    Ambil baris satu periode (Bulan Tahun, Segmen) saja berdasarkan indeks periode.
+
+    Indeks dibaca dari metadata snapshot lokal. Setiap rentang dibaca lebih satu baris
+    di atas & bawahnya; kalau jumlah baris yang cocok tidak sama dengan indeks
+    (baris sudah bergeser / partisi bertambah), indeks di-scan ulang dari kolom kunci
+    lalu dicoba sekali lagi.
+    """
+    header = _fetch_header(link_spreadsheet, nama_worksheet)
+    last_col = rowcol_to_a1(1, len(header))[:-1]
+    i_bulan, i_segmen = header.index("Bulan Tahun"), header.index("Segmen")
+
+    index = read_period_index(link_spreadsheet, nama_worksheet)
+    rows, baris = [], []
+    for attempt in range(2):
+        if index is None or attempt > 0:
+            index = _with_worksheet(link_spreadsheet, nama_worksheet, scan_period_index)
+
+        ranges = _period_ranges(index, bulan, segmen)
+        if not ranges:
+            continue
+        values = _with_worksheet(
+            link_spreadsheet, nama_worksheet,
+            lambda ws: ws.batch_get([f"A{first - 1}:{last_col}{last + 1}" for _, first, last, _ in ranges])
+        )
+        rows, baris = [], []
+        for (seg, first, *_), block in zip(ranges, values):
+            for offset, row in enumerate(fill_gaps(block, cols=len(header))):
+                if row[i_bulan] == bulan and row[i_segmen] == seg:
+                    rows.append(row)
+                    baris.append(first - 1 + offset)  # blok dimulai dari baris first - 1
+        if len(rows) == sum(count for *_, count in ranges):
+            break
+
+    df = pd.DataFrame(rows, columns=header)
+    df[BARIS_SHEET] = np.array(baris, dtype=int)
+    return _hanya_baca(index_periode(apply_schema(df)))
+
+
+def get_period_values(bulan, segmen=None, link_spreadsheet=None, nama_worksheet=None):
+    """
+    Ambil data satu periode dari worksheet DATABASE tanpa mengunduh seluruh histori.
+    Param:
+        - bulan (str): nilai kolom "Bulan Tahun", mis. "9/2025"
+        - segmen (str): segmen ("DGS", ...); None / "-Semua-" untuk semua segmen
+        - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
+        - nama_worksheet (str): nama tab worksheet (default ambil dari st.session_state)
+    Return:
+        - DataFrame bertipe dengan kolom sama seperti `get_database`
+    """
+    link_spreadsheet, nama_worksheet = _resolve_sheet(link_spreadsheet, nama_worksheet)
+    _register_cache(link_spreadsheet, nama_worksheet, _fetch_period_values, nama_worksheet, bulan, segmen)
+    return _fetch_period_values(link_spreadsheet, nama_worksheet, bulan, segmen).copy(deep=False)
+
+
+def invalidate_cache(link_spreadsheet=None, nama_worksheet="DATABASE"):
+    """
+    Hapus cache bersama untuk satu worksheet saja, dipanggil setiap kali
+    worksheet tersebut ditulis.
+    Param:
+        - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
+        - nama_worksheet (str): nama tab worksheet (default "DATABASE")
+    """
+    link_spreadsheet, nama_worksheet = _resolve_sheet(link_spreadsheet, nama_worksheet)
+    _fetch_all_values.clear(link_spreadsheet, nama_worksheet)
+    _fetch_database.clear(link_spreadsheet, nama_worksheet)
+    _fetch_header.clear(link_spreadsheet, nama_worksheet)
+    for cached_fn, args in _cache_registry().pop((link_spreadsheet, nama_worksheet), set()):
+        cached_fn.clear(link_spreadsheet, *args)
+
+
+def get_raw_values(link_spreadsheet=None, nama_worksheet="DATABASE", use_cache=True):
     """
     Ambil nilai mentah dari worksheet Google Sheets.
     Param:
         - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
         - nama_worksheet (str): nama tab worksheet (default "DATABASE")
+        - use_cache (bool): pakai cache bersama lintas session (default True).
+          Set False untuk sheet eksternal yang sedang diedit user (mis. sheet CYC upload).
     Return:
         - DataFrame dengan data mentah dari worksheet
     """
+    link_spreadsheet, nama_worksheet = _resolve_sheet(link_spreadsheet, nama_worksheet)
 
     # ====== Ambil data dari Google Sheets ======
-    worksheet_name = get_worksheet(link_spreadsheet, nama_worksheet)
-    raw_all_values = worksheet_name.get_all_values()
+    if use_cache:
+        raw_all_values = _fetch_all_values(link_spreadsheet, nama_worksheet)
+    else:
+        raw_all_values = _with_worksheet(
+            link_spreadsheet, nama_worksheet, lambda ws: ws.get_all_values()
+        )
 
     if not raw_all_values:
         st.warning(f"Sheet {nama_worksheet} kosong.")
@@ -65,63 +374,97 @@ def get_raw_values(link_spreadsheet=None, nama_worksheet="DATABASE"):
     return df
 
 
-def get_clean_database():
+def get_clean_database(link_spreadsheet=None, nama_worksheet=None):
     """
-    Ambil database bersih dari DataFrame yang sudah dibersihkan.
+    Ambil database bersih (tanpa Saldo Akhir 0 dan minus).
+    Diturunkan dari frame `get_database` yang sedang berlaku dan di-cache per token
+    versinya, jadi selalu sama versinya dengan `get_database`. Query hanya dijalankan
+    sekali per versi data untuk semua session.
     Return:
-        - DataFrame bersih (tanpa 0 dan minus)
+        - View dangkal atas frame bersih bersama (lihat `get_database`)
     """
-    st.session_state["df_database_clean"] = st.session_state["df_database"].query("`Saldo Akhir` > 0").reset_index(drop=True)
-    return st.session_state["df_database_clean"]
+    df = get_database(link_spreadsheet, nama_worksheet)
+    return _clean_versi(df.attrs[VERSI], df).copy(deep=False)
+
+
+def is_database_linked():
+    """
+    Mengecek apakah link database Google Sheet sudah diset, tanpa memuat datanya.
+    Dipakai halaman yang hanya membaca sebagian kecil sheet.
+
+    Returns
+    -------
+    bool
+        True jika `database_gsheet_url` sudah ada di `st.session_state`.
+    """
+    if not st.session_state.get("database_gsheet_url"):
+        st.warning("⚠️ Silakan masukkan link database di halaman Home dulu.")
+        return False
+    return True
 
 
 def is_database_available():
     """
-    Mengecek ketersediaan database Google Sheet dan menyiapkan data bersih di session_state.
+    Mengecek ketersediaan database Google Sheet dan menyiapkan data bersihnya.
 
     Fungsi ini akan:
-    1. Mengecek apakah `df_database` sudah ada di `st.session_state`.
-       - Jika belum ada, akan mengambil data mentah dari Google Sheet berdasarkan 
-         `st.session_state["database_gsheet_url"]` dan opsional `database_sheet_name`.
-    2. Menyimpan hasil query dataframe bersih (`df_database_clean`) hanya sekali,
-       dengan filter `Saldo Akhir > 0`.
-    3. Menampilkan pesan error atau warning melalui Streamlit jika data tidak bisa dimuat
+    1. Memuat database (dan versi bersihnya, filter `Saldo Akhir > 0`) ke cache bersama
+       berdasarkan `st.session_state["database_gsheet_url"]` dan opsional `database_sheet_name`.
+       Data tidak disalin ke `st.session_state`; halaman mengambilnya lewat
+       `get_database` / `get_clean_database`.
+    2. Menampilkan pesan error atau warning melalui Streamlit jika data tidak bisa dimuat
        atau jika URL database belum tersedia.
 
     Returns
     -------
     bool
-        True  : jika database tersedia dan sudah dimuat ke dalam `st.session_state`.
+        True  : jika database tersedia dan sudah dimuat ke cache.
         False : jika database gagal dimuat atau link database belum diset.
     """
    
     # 🔹 Cek apakah URL database tersedia
-    if "database_gsheet_url" not in st.session_state or not st.session_state["database_gsheet_url"]:
-        st.warning("⚠️ Silakan masukkan link database di halaman Home dulu.")
+    if not is_database_linked():
         return False
 
-    # 🔹 Cek apakah data sudah ada di session_state
-    if "df_database" not in st.session_state or st.session_state["df_database"] is None:
-        try:
-            # Ambil data mentah dari Google Sheet
-            st.session_state["df_database"] = get_raw_values(
-                st.session_state["database_gsheet_url"],
-                st.session_state.get("database_sheet_name", "DATABASE")
-            )
+    try:
+        # Ambil data dari snapshot lokal (sinkron inkremental ke Google Sheet)
+        get_clean_database()
+    except Exception as e:
+        st.error(f"Gagal memuat data: {e}")
+        return False
 
-            # Simpan dataframe bersih (hanya sekali)
-            if "df_database_clean" not in st.session_state:
-                st.session_state["df_database_clean"] = (
-                    st.session_state["df_database"]
-                    .query("`Saldo Akhir` > 0")
-                    .reset_index(drop=True)
-                )
+    return True
 
-        except Exception as e:
-            st.error(f"Gagal memuat data: {e}")
-            return False
 
-    return True
+KEY_COLS = ["IdNumber", "Segmen", "Bulan Tahun"]
+
+
+def baris_sheet(df: pd.DataFrame) -> np.ndarray:
+    """
+    Nomor baris Google Sheet (1-based) untuk setiap baris `df`.
+    Diambil dari kolom `BARIS_SHEET` (diisi saat database dimuat); untuk
+    DataFrame lain dianggap urutannya sama dengan sheet (index 0 = baris 2).
+    """
+    if BARIS_SHEET in df.columns:
+        return df[BARIS_SHEET].to_numpy()
+    return np.arange(len(df)) + 2
+
+
+def build_row_index(df_sheet: pd.DataFrame) -> pd.Series:
+    """
+    Indeks (IdNumber, Segmen, Bulan Tahun) -> nomor baris di Google Sheet.
+
+    Dibangun sekali secara vektor dari DataFrame database (nomor baris lewat
+    `baris_sheet`). Kalau ada kunci ganda, baris pertama dipakai.
+
+    Returns
+    -------
+    pd.Series
+        MultiIndex kunci (sebagai string) -> nomor baris sheet (1-based).
+    """
+    keys = pd.MultiIndex.from_frame(df_sheet[KEY_COLS].astype(str))
+    rows = pd.Series(baris_sheet(df_sheet), index=keys)
+    return rows[~keys.duplicated(keep="first")]
 
 
 def update_keterangan_top_kuadran(df_edited: pd.DataFrame) -> None:
@@ -135,8 +478,6 @@ def update_keterangan_top_kuadran(df_edited: pd.DataFrame) -> None:
 
     Parameters
     ----------
-    client : gspread.Client
-        Client gspread yang sudah terautentikasi.
     df_edited : pd.DataFrame
         DataFrame hasil edit dari Streamlit (harus memiliki kolom
         'IdNumber', 'Segmen', 'Bulan Tahun', dan 'Keterangan').
@@ -147,76 +488,361 @@ def update_keterangan_top_kuadran(df_edited: pd.DataFrame) -> None:
 
     Notes
     -----
-    - Data awal sheet diambil dari `st.session_state["df_database"]`
-      untuk memastikan konsistensi dengan session Streamlit.
-    - Index +2 karena:
-        * Index DataFrame mulai dari 0
-        * Baris pertama di Google Sheet adalah header
-    - Hanya kolom 'Keterangan' yang diperbarui.
-    """
-    # Ambil worksheet dan dataframe sheet dari session
+    - Data awal sheet diambil dari `get_database` (frame bersama yang juga
+      dibaca halaman), untuk memastikan konsistensi dengan tampilan Streamlit.
+    - Baris sheet dicari lewat `build_row_index` (sekali jalan, bukan mask per baris edit).
+    - Hanya sel 'Keterangan' yang nilainya berubah yang dikirim, semuanya
+      dalam satu request `batch_update`.
+    """
+    df_sheet = get_database()
+
+    if "Keterangan" not in df_sheet.columns:
+        st.error("Kolom 'Keterangan' tidak ditemukan di database sheet.")
+        return
+
+    # Cari baris sheet untuk setiap hasil edit
+    row_index = build_row_index(df_sheet)
+    edited_keys = pd.MultiIndex.from_frame(df_edited[KEY_COLS].astype(str))
+    sheet_rows = row_index.reindex(edited_keys).to_numpy()
+    found = ~pd.isna(sheet_rows)
+
+    edits = df_edited.loc[found, ["Keterangan"]].assign(row=sheet_rows[found].astype(int))
+    edits = edits.drop_duplicates("row", keep="last")
+
+    # Lewati sel yang nilainya tidak berubah
+    current = (
+        pd.Series(df_sheet["Keterangan"].to_numpy(), index=baris_sheet(df_sheet))
+        .reindex(edits["row"].to_numpy())
+        .to_numpy()
+    )
+    edits = edits[edits["Keterangan"].astype(str).to_numpy() != current.astype(str)]
+    if edits.empty:
+        return
+
+    col_ket = df_sheet.columns.get_loc("Keterangan") + 1  # +1 karena gspread kolom 1-based
     ws = get_worksheet(
+        st.session_state["database_gsheet_url"],
+        st.session_state["database_sheet_name"],
+        refresh=True
+    )
+    ws.batch_update(
+        [
+            {"range": rowcol_to_a1(row, col_ket), "values": [[ket]]}
+            for row, ket in zip(edits["row"], edits["Keterangan"])
+        ],
+        value_input_option=ValueInputOption.user_entered
+    )
+
+    # Data sheet berubah -> buang cache bersama.
+    # Edit Keterangan tidak mengubah Last Updated, jadi partisinya ditandai manual.
+    invalidate_snapshot_partitions(
+        st.session_state["database_gsheet_url"],
+        st.session_state["database_sheet_name"],
+        df_edited[["Bulan Tahun", "Segmen"]].drop_duplicates().itertuples(index=False)
+    )
+    invalidate_cache(
         st.session_state["database_gsheet_url"],
         st.session_state["database_sheet_name"]
     )
-    df_sheet = st.session_state["df_database"]
 
-    if "Keterangan" not in df_sheet.columns:
-        st.error("Kolom 'Keterangan' tidak ditemukan di database sheet.")
-        return
 
-    # Loop hasil edit
-    for _, row in df_edited.iterrows():
-        mask = (
-            (df_sheet["IdNumber"] == row["IdNumber"]) &
-            (df_sheet["Segmen"] == row["Segmen"]) &
-            (df_sheet["Bulan Tahun"] == row["Bulan Tahun"])
-        )
+def update_column_cells(nama_kolom, sheet_rows, values, partitions=(), link_spreadsheet=None, nama_worksheet=None):
+    """
+    Tulis nilai satu kolom di baris-baris tertentu worksheet DATABASE.
+    Baris yang berurutan digabung menjadi satu range, dan semua range
+    dikirim dalam satu request `batch_update`.
+
+    Parameters
+    ----------
+    nama_kolom : str
+        Nama kolom (header) yang ditulis, mis. "Kuadran".
+    sheet_rows : array-like of int
+        Nomor baris sheet (1-based, baris 2 = data pertama).
+    values : array-like
+        Nilai baru, sejajar dengan `sheet_rows`.
+    partitions : iterable of (Bulan Tahun, Segmen)
+        Partisi yang tersentuh, ditandai agar snapshot lokal mengunduhnya ulang
+        (penulisan ini tidak mengubah kolom Last Updated).
+
+    Returns
+    -------
+    int
+        Jumlah range yang dikirim.
+    """
+    link_spreadsheet, nama_worksheet = _resolve_sheet(link_spreadsheet, nama_worksheet)
+    sheet_rows = np.asarray(sheet_rows, dtype=int)
+    values = np.asarray(values, dtype=object)
+    if len(sheet_rows) == 0:
+        return 0
+
+    order = np.argsort(sheet_rows, kind="stable")
+    sheet_rows, values = sheet_rows[order], values[order]
+
+    header = _fetch_header(link_spreadsheet, nama_worksheet)
+    letter = rowcol_to_a1(1, header.index(nama_kolom) + 1)[:-1]
+
+    # Pecah jadi potongan baris yang berurutan (2,3,4 | 9 | 11,12)
+    breaks = np.flatnonzero(np.diff(sheet_rows) != 1) + 1
+    data = [
+        {
+            "range": f"{letter}{rows[0]}:{letter}{rows[-1]}",
+            "values": [[v] for v in vals.tolist()],
+        }
+        for rows, vals in zip(np.split(sheet_rows, breaks), np.split(values, breaks))
+    ]
+
+    ws = get_worksheet(link_spreadsheet, nama_worksheet, refresh=True)
+    ws.batch_update(data, value_input_option=ValueInputOption.user_entered)
+
+    invalidate_snapshot_partitions(link_spreadsheet, nama_worksheet, partitions)
+    invalidate_cache(link_spreadsheet, nama_worksheet)
+    return len(data)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
 
-        if mask.any():
-            idx = df_sheet[mask].index[0]  # ambil index pertama yang cocok
-            cell_row = idx + 2  # +2 karena index 0-based & baris header
-            col_ket = df_sheet.columns.get_loc("Keterangan") + 1  # +1 karena gspread kolom 1-based
 
-            ws.update_cell(cell_row, col_ket, row["Keterangan"])
+def _cell_text(value):
+    """Normalisasi nilai sel untuk dibandingkan: angka -> float, teks -> strip, kosong -> ""."""
+    if pd.isna(value):
+        return ""
+    if _is_number(value):
+        return repr(float(value))
+    return str(value).strip()
+
+
+def _cell_data(value):
+    """CellData untuk request updateCells (angka tetap angka, selain itu teks)."""
+    if pd.isna(value):
+        return {}
+    if _is_number(value):
+        return {"userEnteredValue": {"numberValue": float(value)}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def _row_keys_and_hashes(df, compare_cols):
+    """
+    Kunci baris (IdNumber + urutan kemunculan, supaya IdNumber ganda tetap unik)
+    dan hash isi baris (kolom `compare_cols`) untuk diff.
+    """
+    text = df[compare_cols].apply(lambda col: col.map(_cell_text))
+    keys = list(zip(text["IdNumber"], text.groupby("IdNumber").cumcount()))
+    hashes = pd.util.hash_pandas_object(text, index=False).to_numpy()
+    return keys, hashes
 
 
 def update_database(bulan, segmen, df_baru):
     """
-    Ganti data di worksheet berdasarkan Bulan/Tahun & Segmen.
-    - Hapus baris lama secara batch
-    - Upload data baru
-    - Sortir ulang
+    Upsert data di worksheet berdasarkan Bulan/Tahun & Segmen (diff per baris).
+    - Baris lama partisi dibandingkan dengan `df_baru` lewat hash isi baris
+      (kunci: IdNumber; kolom partisi & Last Updated tidak ikut dibandingkan)
+    - Hanya baris yang berubah, bertambah, atau hilang yang dikirim, semuanya
+      dalam satu request `batch_update` di posisi partisi tersebut
+    - Partisi baru disisipkan sesuai urutan sheet (Bulan Tahun terbaru, lalu Segmen),
+      jadi sheet tidak perlu disortir ulang
     """
-    worksheet = get_worksheet()
-    all_values = worksheet.get_all_values()
+    worksheet = get_worksheet(refresh=True)
+    header = worksheet.row_values(1)
 
-    if not all_values:
+    if not header:
         st.warning("Sheet masih kosong. Data baru akan ditambahkan.")
-        last_row = 1
-    else:
-        col_bulan = [row[0] for row in all_values]
-        col_segmen = [row[1] for row in all_values]
+        set_with_dataframe(worksheet, df_baru, row=1, include_column_header=True)
+        st.success(f"✅ {len(df_baru)} baris baru ditambahkan.")
+        invalidate_cache()
+        update_rekap({(bulan, segmen): df_baru})
+        return
 
-        rows_to_delete = [
-            i+1 for i, (bulan_val, segmen_val) in enumerate(zip(col_bulan, col_segmen))
-            if bulan_val == bulan and segmen_val == segmen
-        ]
+    df_baru = df_baru.reindex(columns=header).reset_index(drop=True)
+    # Kolom partisi pasti sama dalam satu partisi (dan bisa tersimpan sebagai
+    # tanggal di sheet), jadi tidak ikut dibandingkan
+    compare_cols = [col for col in header if col not in PARTITION_COLS + [VERSION_COL]]
+    last_col = rowcol_to_a1(1, len(header))[:-1]
+    key = partition_key(bulan, segmen)
+
+    # ====== Baris lama partisi (nilai asli, bukan hasil format tampilan) ======
+    partitions = scan_partition_rows(worksheet, header)
+    old_rows = partitions.get(key, np.array([], dtype=int))
+    if len(old_rows):
+        block = worksheet.get(
+            f"A{old_rows.min()}:{last_col}{old_rows.max()}",
+            value_render_option=ValueRenderOption.unformatted
+        )
+        block = fill_gaps(block, rows=old_rows.max() - old_rows.min() + 1, cols=len(header))
+        df_lama = pd.DataFrame([block[r - old_rows.min()] for r in old_rows], columns=header)
+    else:
+        df_lama = pd.DataFrame(columns=header)
+
+    # ====== Diff ======
+    old_keys, old_hashes = _row_keys_and_hashes(df_lama, compare_cols)
+    new_keys, new_hashes = _row_keys_and_hashes(df_baru, compare_cols)
+    old_by_key = {k: (row, h) for k, row, h in zip(old_keys, old_rows, old_hashes)}
+    new_key_set = set(new_keys)
+
+    changed, inserted = [], []
+    for i, (k, h) in enumerate(zip(new_keys, new_hashes)):
+        if k not in old_by_key:
+            inserted.append(i)
+        elif old_by_key[k][1] != h:
+            changed.append((old_by_key[k][0], i))
+    free_rows = sorted(row for k, (row, _) in old_by_key.items() if k not in new_key_set)
+
+    # Baris baru mengisi slot baris yang hilang dulu, sisanya disisipkan
+    writes = changed + list(zip(free_rows, inserted))
+    leftover_rows = free_rows[len(inserted):]
+    appended = inserted[len(free_rows):]
+
+    if not writes and not leftover_rows and not appended:
+        st.info(f"✅ Tidak ada perubahan untuk {segmen} - {bulan}.")
+        return
 
-        if rows_to_delete:
-            start, end = min(rows_to_delete), max(rows_to_delete)
-            worksheet.delete_rows(start, end)
-            st.info(f"🗑️ {len(rows_to_delete)} baris dihapus untuk {segmen} - {bulan}.")
+    # ====== Susun satu batch_update ======
+    sheet_id = worksheet.id
+    values = df_baru.to_numpy(dtype=object)
+
+    def update_cells(row_index, rows):
+        return {"updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": int(row_index), "columnIndex": 0},
+            "rows": [{"values": [_cell_data(v) for v in values[i]]} for i in rows],
+            "fields": "userEnteredValue",
+        }}
+
+    requests = [update_cells(row - 1, [i]) for row, i in writes]
+    for row in sorted(leftover_rows, reverse=True):
+        requests.append({"deleteDimension": {"range": {
+            "sheetId": sheet_id, "dimension": "ROWS", "startIndex": int(row - 1), "endIndex": int(row)
+        }}})
+
+    if appended:
+        if len(old_rows):
+            # Tepat setelah baris terakhir partisi (tidak ada baris yang dihapus
+            # kalau masih ada sisa baris baru)
+            insert_at = old_rows.max()
+        else:
+            after = [
+                rows.min() for k, rows in partitions.items()
+                if partition_sort_key(k) > partition_sort_key(key)
+            ]
+            insert_at = min(after) - 1 if after else None
+
+        if insert_at is None:
+            requests.append({"appendCells": {
+                "sheetId": sheet_id,
+                "rows": [{"values": [_cell_data(v) for v in values[i]]} for i in appended],
+                "fields": "userEnteredValue",
+            }})
         else:
-            st.info(f"⚠️ Tidak ada data untuk {segmen} - {bulan}.")
+            requests.append({"insertDimension": {
+                "range": {
+                    "sheetId": sheet_id, "dimension": "ROWS",
+                    "startIndex": int(insert_at), "endIndex": int(insert_at + len(appended))
+                },
+                "inheritFromBefore": bool(insert_at > 1),
+            }})
+            requests.append(update_cells(insert_at, appended))
+
+    worksheet.spreadsheet.batch_update({"requests": requests})
+    st.info(
+        f"📌 {segmen} - {bulan}: {len(changed)} baris diubah, "
+        f"{len(inserted)} baris ditambahkan, {len(free_rows)} baris dihapus."
+    )
 
-        last_row = len(worksheet.get_all_values()) + 1
+    # Data sheet berubah -> buang cache bersama
+    invalidate_cache()
+    update_rekap({(bulan, segmen): df_baru})
 
-    set_with_dataframe(worksheet, df_baru, row=last_row, include_column_header=False)
-    st.success(f"✅ {len(df_baru)} baris baru ditambahkan.")
 
-    worksheet.sort((1, "des"), (2, "asc"), (11, "des"))
-    st.info("📌 Data disortir berdasarkan Tanggal & Segmen.")
+def get_rekap(link_spreadsheet=None):
+    """
+    Ambil worksheet REKAP (ringkasan kecil, lihat `utils.rekap`) untuk dashboard
+    yang hanya butuh angka ringkasan.
+    Param:
+        - link_spreadsheet (str): URL Spreadsheet (default ambil dari st.session_state)
+    Return:
+        - DataFrame bertipe & diindeks `index_periode`, atau None kalau REKAP
+          belum pernah ditulis (halaman lalu memakai data detail)
+    """
+    link_spreadsheet, _ = _resolve_sheet(link_spreadsheet)
+    # Cek dari handle yang di-cache, supaya REKAP yang belum ada tidak memicu request metadata
+    if REKAP_SHEET not in _worksheet_handles(link_spreadsheet):
+        return None
+    _register_cache(link_spreadsheet, REKAP_SHEET, _fetch_rekap)
+    df = _fetch_rekap(link_spreadsheet)
+    if df.empty:
+        return None
+    return index_periode(df)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_rekap(link_spreadsheet):
+    """Isi worksheet REKAP (nilai mentah), bertipe sesuai `REKAP_SCHEMA`."""
+    values = _with_worksheet(
+        link_spreadsheet, REKAP_SHEET,
+        lambda ws: ws.get_all_values(value_render_option=ValueRenderOption.unformatted)
+    )
+    return _rekap_frame(values)
+
+
+def _rekap_frame(values):
+    """DataFrame REKAP bertipe dari nilai mentah worksheet (baris pertama = header)."""
+    values = fill_gaps(values) if values else [REKAP_COLS]
+    df = pd.DataFrame(values[1:], columns=values[0]).reindex(columns=REKAP_COLS)
+    return apply_schema(df, REKAP_SCHEMA)
+
+
+def update_rekap(partisi, link_spreadsheet=None, nama_worksheet=None):
+    """
+    Perbarui worksheet REKAP untuk partisi yang baru ditulis ke DATABASE.
+
+    Parameters
+    ----------
+    partisi : dict
+        {(Bulan Tahun, Segmen): DataFrame detail bertipe partisi tersebut (isi terbaru)}.
+        Baris REKAP lama partisi ini diganti, partisi lain dibiarkan.
+
+    Notes
+    -----
+    - Kalau REKAP belum ada, worksheet dibuat lalu diisi dari seluruh DATABASE
+      (sekali saja), supaya partisi lama ikut tercakup.
+    - REKAP kecil (puluhan baris per bulan), jadi ditulis ulang seluruhnya:
+      satu `batch_update` (ubah jumlah baris + updateCells).
+    """
+    link_spreadsheet, nama_worksheet = _resolve_sheet(link_spreadsheet, nama_worksheet)
+    spreadsheet = get_spreadsheet(link_spreadsheet)
+    try:
+        ws = get_worksheet(link_spreadsheet, REKAP_SHEET, refresh=True)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = None
+
+    if ws is None:
+        ws = spreadsheet.add_worksheet(REKAP_SHEET, rows=1, cols=len(REKAP_COLS))
+        invalidate_worksheet_handles(link_spreadsheet)
+        rekap = bangun_rekap(get_database(link_spreadsheet, nama_worksheet))
+    else:
+        df_lama = _rekap_frame(ws.get_all_values(value_render_option=ValueRenderOption.unformatted))
+        diganti = pd.MultiIndex.from_frame(df_lama[PARTITION_COLS]).isin(list(partisi))
+        rekap = pd.concat(
+            [df_lama[~diganti]]
+            + [
+                bangun_rekap(df.assign(**{"Bulan Tahun": bulan, "Segmen": segmen}))
+                for (bulan, segmen), df in partisi.items()
+            ],
+            ignore_index=True
+        )
+
+    rows = [REKAP_COLS] + urutkan_rekap(rekap).to_numpy(dtype=object).tolist()
+    spreadsheet.batch_update({"requests": [
+        {"updateSheetProperties": {
+            "properties": {"sheetId": ws.id, "gridProperties": {"rowCount": len(rows), "columnCount": len(REKAP_COLS)}},
+            "fields": "gridProperties(rowCount,columnCount)",
+        }},
+        {"updateCells": {
+            "start": {"sheetId": ws.id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [{"values": [_cell_data(v) for v in row]} for row in rows],
+            "fields": "userEnteredValue",
+        }},
+    ]})
+    invalidate_cache(link_spreadsheet, REKAP_SHEET)
 
 
 @st.dialog("Konfirmasi Upload Data")
@@ -229,9 +855,14 @@ def confirm_update_database(df_upload, tanggal_target, segmen_target):
     
     # Tombol ditumpuk (1 kolom penuh)
     if st.button("✅ Ya, Upload Sekarang", use_container_width=True):
-        update_database(
-             tanggal_target, segmen_target, df_upload
-        )
+        # Upload semua segmen ditulis per partisi (Bulan Tahun, Segmen) sesuai kolom Segmen
+        if segmen_target == "-Semua-":
+            for segmen, df_segmen in df_upload.groupby("Segmen", sort=True):
+                update_database(tanggal_target, segmen, df_segmen)
+        else:
+            update_database(
+                 tanggal_target, segmen_target, df_upload
+            )
         st.success("✅ Data berhasil diunggah ke Google Sheets!")
 
         # Hapus dataframe dari session_state biar bersih
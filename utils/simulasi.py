@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.schema import SEMUA, VERSI
+
+
+class _Grid:
+    """
+    Prefix sum 2D (jumlah pelanggan & total saldo) untuk satu (Segmen, Bulan Tahun).
+
+    Sumbu saldo = nilai Saldo Akhir unik (urut), sumbu waktu = nilai Lama Tunggakan unik,
+    jadi hasil lookup persis sama dengan klasifikasi per baris (tanpa binning).
+    """
+
+    def __init__(self, saldo: np.ndarray, lama: np.ndarray):
+        self.saldo_urut = np.sort(saldo)
+        self.saldo_vals, i_saldo = np.unique(saldo, return_inverse=True)
+        self.lama_vals, i_lama = np.unique(lama, return_inverse=True)
+        shape = (len(self.saldo_vals), len(self.lama_vals))
+
+        jumlah = np.zeros(shape)
+        total = np.zeros(shape)
+        np.add.at(jumlah, (i_saldo, i_lama), 1)
+        np.add.at(total, (i_saldo, i_lama), saldo)
+
+        # Baris & kolom nol di depan -> cum[i, j] = nilai untuk saldo ke-<i & lama ke-<j
+        self.cum = np.zeros((2, shape[0] + 1, shape[1] + 1))
+        self.cum[0, 1:, 1:] = jumlah.cumsum(0).cumsum(1)
+        self.cum[1, 1:, 1:] = total.cumsum(0).cumsum(1)
+
+    def kuadran(self, batas_nominal, batas_waktu) -> np.ndarray:
+        """
+        Ringkasan kuadran untuk semua pasangan kandidat batas sekaligus.
+        Aturan sama dengan `utils.format.klasifikasi_kuadran`.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (2, 4, N, M): [jumlah pelanggan, total saldo] x kuadran 1-4
+            x N kandidat batas nominal x M kandidat batas waktu.
+        """
+        i = np.searchsorted(self.saldo_vals, np.atleast_1d(batas_nominal), side="right")[:, None]
+        j = np.searchsorted(self.lama_vals, np.atleast_1d(batas_waktu), side="right")[None, :]
+        semua = self.cum[:, -1:, -1:]
+        kecil = self.cum[:, i, -1]      # Saldo Akhir <= batas nominal
+        baru = self.cum[:, -1, j]       # Lama Tunggakan <= batas waktu
+        kecil_baru = self.cum[:, i, j]
+        q1 = baru - kecil_baru
+        q2 = semua - kecil - q1
+        q4 = kecil - kecil_baru
+        return np.stack([q1, q2, kecil_baru, q4], axis=1)
+
+
+class SimulatorKuadran:
+    """
+    Simulasi "bagaimana jika" batas kuadran tanpa menghitung ulang per baris.
+
+    Dibangun sekali dari DataFrame database (bertipe), lalu setiap perubahan
+    batas dijawab dengan lookup prefix sum per (Segmen, Bulan Tahun).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Database bertipe dengan kolom Segmen, Bulan Tahun, Saldo Akhir, Lama Tunggakan.
+        Hanya pelanggan dengan Saldo Akhir > 0 yang dihitung (sama seperti halaman kuadran).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df[df["Saldo Akhir"] > 0]
+        self._grids = {}
+        self.periode = {}
+        self.saldo_maks = {}
+        self.lama_vals = {}
+        for (segmen, bulan_tahun), grp in df.groupby(["Segmen", "Bulan Tahun"], sort=False, observed=True):
+            grid = _Grid(
+                grp["Saldo Akhir"].to_numpy(dtype=float),
+                grp["Lama Tunggakan"].to_numpy(dtype=float),
+            )
+            self._grids[(segmen, bulan_tahun)] = grid
+            self.periode.setdefault(segmen, []).append(bulan_tahun)
+            self.saldo_maks[segmen] = max(self.saldo_maks.get(segmen, 0.0), float(grid.saldo_vals[-1]))
+            self.lama_vals[segmen] = np.union1d(self.lama_vals.get(segmen, []), grid.lama_vals)
+
+    def hitung(self, segmen: str, batas_nominal: float, batas_waktu: float, bulan_tahun: str = SEMUA) -> pd.DataFrame:
+        """
+        Ringkasan per kuadran untuk batas yang dicoba.
+
+        Parameters
+        ----------
+        segmen : str
+            Segmen yang disimulasikan.
+        batas_nominal, batas_waktu : float
+            Batas Nominal & Batas Waktu (bulan) yang dicoba.
+        bulan_tahun : str
+            Periode, mis. "9/2025"; "-Semua-" untuk semua periode segmen tersebut.
+
+        Returns
+        -------
+        pd.DataFrame
+            Index Kuadran 1-4, kolom "Jumlah Pelanggan" & "Total Saldo".
+        """
+        hasil = self.sapu(segmen, batas_nominal, batas_waktu, bulan_tahun)[:, :, 0, 0]
+        return pd.DataFrame(
+            {"Jumlah Pelanggan": hasil[0].astype(int), "Total Saldo": hasil[1]},
+            index=pd.Index([1, 2, 3, 4], name="Kuadran"),
+        )
+
+    def _grids_periode(self, segmen: str, bulan_tahun: str) -> list:
+        periode = self.periode.get(segmen, []) if bulan_tahun == SEMUA else [bulan_tahun]
+        return [self._grids[(segmen, p)] for p in periode if (segmen, p) in self._grids]
+
+    def sapu(self, segmen: str, kandidat_nominal, kandidat_waktu, bulan_tahun: str = SEMUA) -> np.ndarray:
+        """
+        Evaluasi semua pasangan (batas nominal, batas waktu) dalam satu kali jalan.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (2, 4, N, M), lihat `_Grid.kuadran`.
+        """
+        hasil = np.zeros((2, 4, np.size(kandidat_nominal), np.size(kandidat_waktu)))
+        for grid in self._grids_periode(segmen, bulan_tahun):
+            hasil += grid.kuadran(kandidat_nominal, kandidat_waktu)
+        return hasil
+
+    def sarankan_batas(
+            self,
+            segmen: str,
+            target_besar: float,
+            target_lama: float,
+            basis: str = "Total Saldo",
+            bulan_tahun: str = SEMUA,
+            n_kandidat: int = 1000,
+            top: int = 5,
+            ) -> pd.DataFrame:
+        """
+        Cari batas kuadran yang pembagiannya paling dekat dengan target.
+
+        Kandidat Batas Nominal = kuantil Saldo Akhir (maks. `n_kandidat` nilai),
+        kandidat Batas Waktu = nilai Lama Tunggakan yang ada. Semua pasangan
+        dievaluasi sekaligus lewat `sapu`.
+
+        Parameters
+        ----------
+        target_besar : float
+            Target porsi (0-1) Kuadran 1+2 (nominal besar).
+        target_lama : float
+            Target porsi (0-1) Kuadran 2+4 (tunggakan lama).
+        basis : str
+            "Jumlah Pelanggan" atau "Total Saldo" sebagai dasar porsi.
+
+        Returns
+        -------
+        pd.DataFrame
+            `top` pasangan terbaik: Batas Nominal, Batas Waktu (bulan),
+            porsi Kuadran 1-4 (sesuai basis) dan selisih dari target.
+        """
+        grids = self._grids_periode(segmen, bulan_tahun)
+        if not grids:
+            return pd.DataFrame()
+
+        saldo = np.concatenate([g.saldo_urut for g in grids])
+        kandidat_nominal = np.unique(np.quantile(saldo, np.linspace(0, 1, n_kandidat)))
+        kandidat_waktu = self.lama_vals[segmen]
+
+        hasil = self.sapu(segmen, kandidat_nominal, kandidat_waktu, bulan_tahun)
+        nilai = hasil[0 if basis == "Jumlah Pelanggan" else 1]          # (4, N, M)
+        total = nilai.sum(axis=0)
+        porsi = np.divide(nilai, total, out=np.zeros_like(nilai), where=total > 0)
+
+        selisih = np.abs(porsi[0] + porsi[1] - target_besar) + np.abs(porsi[1] + porsi[3] - target_lama)
+        terbaik = np.argsort(selisih, axis=None, kind="stable")[:top]
+        i, j = np.unravel_index(terbaik, selisih.shape)
+
+        return pd.DataFrame({
+            "Batas Nominal": kandidat_nominal[i],
+            "Batas Waktu (bulan)": kandidat_waktu[j],
+            **{f"Kuadran {q + 1}": porsi[q, i, j] for q in range(4)},
+            "Selisih": selisih[i, j],
+        })
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _simulator_versi(versi: str, _df: pd.DataFrame) -> SimulatorKuadran:
+    """Simulator per versi data (df tidak di-hash, cukup token versinya)."""
+    return SimulatorKuadran(_df)
+
+
+def get_simulator(df: pd.DataFrame) -> SimulatorKuadran:
+    """
+    Simulator untuk DataFrame database, dibangun sekali per versi data
+    (token `VERSI` dari `index_periode`) dan dibagikan ke semua session.
+    Simulator hanya dibaca setelah dibangun, jadi aman dipakai bersama.
+    """
+    versi = df.attrs.get(VERSI)
+    if versi is None:
+        return SimulatorKuadran(df)
+    return _simulator_versi(versi, df)
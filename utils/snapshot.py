@@ -0,0 +1,255 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+# Folder snapshot lokal (Parquet + metadata partisi) untuk worksheet DATABASE
+SNAPSHOT_DIR = os.path.join(".cache", "snapshot")
+
+# Kolom kunci partisi & penanda versi partisi (ditulis oleh validasi_data_upload)
+PARTITION_COLS = ["Bulan Tahun", "Segmen"]
+VERSION_COL = "Last Updated"
+
+
+def _snapshot_paths(link_spreadsheet: str, nama_worksheet: str) -> tuple[str, str]:
+    """Path file Parquet & metadata untuk pasangan (URL spreadsheet, nama worksheet)."""
+    key = hashlib.md5(f"{link_spreadsheet}|{nama_worksheet}".encode()).hexdigest()
+    base = os.path.join(SNAPSHOT_DIR, key)
+    return base + ".parquet", base + ".json"
+
+
+def partition_key(bulan: str, segmen: str) -> str:
+    """Kunci partisi di metadata snapshot, mis. "9/2025|DGS"."""
+    return f"{bulan}|{segmen}"
+
+
+def partition_sort_key(key: str) -> tuple:
+    """Urutan partisi di sheet: Bulan Tahun terbaru dulu, lalu Segmen A-Z."""
+    bulan_tahun, segmen = key.split("|", 1)
+    try:
+        bulan, tahun = (int(x) for x in bulan_tahun.split("/"))
+    except ValueError:
+        bulan, tahun = 0, 0
+    return (-tahun, -bulan, segmen)
+
+
+def _load_snapshot(link_spreadsheet: str, nama_worksheet: str) -> tuple[pd.DataFrame | None, dict]:
+    """Baca snapshot lama. Kalau belum ada/rusak, kembalikan (None, {})."""
+    path_data, path_meta = _snapshot_paths(link_spreadsheet, nama_worksheet)
+    try:
+        with open(path_meta) as f:
+            meta = json.load(f)
+        df = pd.read_parquet(path_data)
+    except (OSError, ValueError):
+        return None, {}
+    return df, meta
+
+
+def _save_snapshot(link_spreadsheet: str, nama_worksheet: str, df: pd.DataFrame | None, meta: dict) -> None:
+    """
+    Simpan snapshot (df=None -> hanya metadata).
+    Gagal tulis (mis. disk read-only) tidak menghentikan aplikasi.
+    """
+    path_data, path_meta = _snapshot_paths(link_spreadsheet, nama_worksheet)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        if df is not None:
+            df.to_parquet(path_data, index=False)
+        with open(path_meta, "w") as f:
+            json.dump(meta, f)
+    except OSError:
+        pass
+
+
+def _pad(rows: list, n_rows: int, n_cols: int) -> list:
+    """Google Sheets memotong sel kosong di ujung baris/kolom; samakan ukurannya lagi."""
+    rows = [list(r) + [""] * (n_cols - len(r)) for r in rows]
+    return rows + [[""] * n_cols for _ in range(n_rows - len(rows))]
+
+
+def _scan_partitions(worksheet, header: list) -> pd.DataFrame:
+    """
+    Baca hanya kolom Bulan Tahun, Segmen & Last Updated (satu batch_get)
+    untuk mengetahui posisi baris tiap partisi.
+
+    Returns
+    -------
+    pd.DataFrame
+        Satu baris per posisi data (0 = baris sheet ke-2) dengan kolom
+        'key' (partisi) dan 'pos'.
+    """
+    ranges = []
+    for col in PARTITION_COLS + [VERSION_COL]:
+        letter = rowcol_to_a1(1, header.index(col) + 1)[:-1]
+        ranges.append(f"{letter}2:{letter}")
+    cols = worksheet.batch_get(ranges, major_dimension="COLUMNS")
+    cols = [c[0] if c else [] for c in cols]
+
+    n_rows = max(len(c) for c in cols)
+    cols = [c + [""] * (n_rows - len(c)) for c in cols]
+
+    return pd.DataFrame({
+        "key": [partition_key(b, s) for b, s in zip(cols[0], cols[1])],
+        "version": cols[2],
+        "pos": np.arange(n_rows),
+    })
+
+
+def _row_ranges(keys: pd.DataFrame) -> dict:
+    """
+    Indeks partisi -> [baris pertama, baris terakhir, jumlah baris] (nomor baris sheet).
+    Karena sheet disortir per Bulan Tahun & Segmen, rentang ini biasanya rapat.
+    """
+    grouped = keys.groupby("key", sort=False)["pos"].agg(["min", "max", "count"])
+    return {
+        key: [int(row["min"]) + 2, int(row["max"]) + 2, int(row["count"])]
+        for key, row in grouped.iterrows()
+    }
+
+
+def scan_period_index(worksheet) -> dict:
+    """
+    Bangun ulang indeks periode langsung dari sheet (hanya membaca kolom kunci).
+
+    Returns
+    -------
+    dict
+        {"Bulan Tahun|Segmen": [baris pertama, baris terakhir, jumlah baris]}
+    """
+    header = worksheet.row_values(1)
+    if any(col not in header for col in PARTITION_COLS + [VERSION_COL]):
+        return {}
+    return _row_ranges(_scan_partitions(worksheet, header))
+
+
+def scan_partition_rows(worksheet, header: list) -> dict:
+    """
+    Nomor baris sheet setiap partisi, dibaca langsung dari kolom kunci.
+    Berbeda dengan indeks periode, hasilnya tetap tepat walau partisi tidak rapat.
+
+    Returns
+    -------
+    dict
+        {"Bulan Tahun|Segmen": np.ndarray nomor baris sheet (1-based, urut naik)}
+    """
+    keys = _scan_partitions(worksheet, header)
+    return {
+        key: pos + 2
+        for key, pos in keys.groupby("key", sort=False)["pos"].apply(np.asarray).items()
+    }
+
+
+def read_period_index(link_spreadsheet: str, nama_worksheet: str) -> dict | None:
+    """Indeks periode dari metadata snapshot terakhir (None kalau belum pernah sinkron)."""
+    _, path_meta = _snapshot_paths(link_spreadsheet, nama_worksheet)
+    try:
+        with open(path_meta) as f:
+            return json.load(f).get("ranges")
+    except (OSError, ValueError):
+        return None
+
+
+def _fingerprints(keys: pd.DataFrame) -> dict:
+    """Fingerprint partisi = jumlah baris + himpunan nilai Last Updated."""
+    return {
+        key: hashlib.md5(
+            f"{len(grp)}|{'|'.join(sorted(set(grp['version'])))}".encode()
+        ).hexdigest()
+        for key, grp in keys.groupby("key", sort=False)
+    }
+
+
+def sync_snapshot(worksheet, link_spreadsheet: str, nama_worksheet: str) -> pd.DataFrame:
+    """
+    Sinkronkan snapshot lokal worksheet DATABASE secara inkremental.
+
+    Hanya partisi (Bulan Tahun, Segmen) yang fingerprint `Last Updated`-nya
+    berubah sejak sinkron terakhir yang diunduh ulang, dalam satu batch_get.
+    Partisi lain diambil dari file Parquet lokal.
+
+    Parameters
+    ----------
+    worksheet : gspread.Worksheet
+        Worksheet DATABASE.
+    link_spreadsheet, nama_worksheet : str
+        Identitas snapshot di disk.
+
+    Returns
+    -------
+    pd.DataFrame
+        Data mentah (string) dengan urutan & index sama seperti sheet
+        (index 0 = baris sheet ke-2), setara dengan `get_raw_values`.
+    """
+    header = worksheet.row_values(1)
+    if not header:
+        return pd.DataFrame()
+
+    # Sheet tanpa kolom partisi/versi tidak bisa disinkron per partisi
+    if any(col not in header for col in PARTITION_COLS + [VERSION_COL]):
+        raw = worksheet.get_all_values()
+        return pd.DataFrame(raw[1:], columns=raw[0])
+
+    df_old, meta = _load_snapshot(link_spreadsheet, nama_worksheet)
+    if df_old is None or meta.get("header") != header:
+        df_old, meta = None, {}
+
+    keys = _scan_partitions(worksheet, header)
+    fingerprints = _fingerprints(keys)
+    old_fingerprints = meta.get("partitions", {})
+
+    n_cols = len(header)
+    last_col = rowcol_to_a1(1, n_cols)[:-1]
+    data = np.empty((len(keys), n_cols), dtype=object)
+
+    old_groups = {}
+    if df_old is not None:
+        old_values = df_old.to_numpy(dtype=object)
+        old_groups = df_old.groupby(PARTITION_COLS, sort=False).indices
+
+    # Partisi yang berubah: ambil rentang barisnya saja dalam satu request
+    changed, ranges = [], []
+    for key, grp in keys.groupby("key", sort=False):
+        pos = grp["pos"].to_numpy()
+        old_pos = old_groups.get(tuple(key.split("|", 1)))
+        if (
+            old_pos is not None
+            and old_fingerprints.get(key) == fingerprints[key]
+            and len(old_pos) == len(pos)
+        ):
+            data[pos] = old_values[old_pos]
+            continue
+        # Ambil rentang min..max (pasti mencakup semua baris partisi)
+        changed.append(pos)
+        ranges.append(f"A{pos.min() + 2}:{last_col}{pos.max() + 2}")
+
+    if ranges:
+        fetched = worksheet.batch_get(ranges)
+        for pos, rows in zip(changed, fetched):
+            rows = _pad(rows, pos.max() - pos.min() + 1, n_cols)
+            data[pos] = np.array(rows, dtype=object)[pos - pos.min()]
+
+    df = pd.DataFrame(data, columns=header)
+    _save_snapshot(link_spreadsheet, nama_worksheet, df, {
+        "header": header,
+        "partitions": fingerprints,
+        "ranges": _row_ranges(keys),
+    })
+    return df
+
+
+def invalidate_snapshot_partitions(link_spreadsheet: str, nama_worksheet: str, partitions) -> None:
+    """
+    Tandai partisi (Bulan Tahun, Segmen) agar diunduh ulang pada sinkron berikutnya.
+    Dipakai untuk perubahan yang tidak menyentuh kolom Last Updated (mis. edit Keterangan).
+    """
+    _, path_meta = _snapshot_paths(link_spreadsheet, nama_worksheet)
+    try:
+        with open(path_meta) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return
+    for bulan, segmen in partitions:
+        meta.get("partitions", {}).pop(partition_key(bulan, segmen), None)
+    _save_snapshot(link_spreadsheet, nama_worksheet, None, meta)
@@ -1,7 +1,20 @@
 
+import math
+import numpy as np
 import streamlit as st
+import plotly.express as px
 from datetime import datetime
-from utils.services import update_database
+from functools import partial
+from utils.services import update_database, get_database
+from utils.schema import AGING_COLS, BARIS_SHEET
+from utils.pencarian import riwayat_pelanggan
+from utils.peringkat import urutan_kolom
+
+# Pilihan jumlah baris per halaman tabel berhalaman
+UKURAN_HALAMAN = [25, 50, 100, 250]
+
+# Kolom timeline riwayat pelanggan
+KOLOM_RIWAYAT = ["Bulan Tahun", "Segmen", "Saldo Akhir", *AGING_COLS, "Lama Tunggakan", "Kuadran", "Keterangan"]
 
 def pilih_kategori():
     """
@@ -75,4 +88,100 @@ def confirm_upload_dialog(df_upload, tanggal_target, segmen_target):
 
     if st.button("❌ Batal", use_container_width=True):
         st.info("Upload dibatalkan.")
-        st.rerun()  # refresh agar dialog tertutup
\ No newline at end of file
+        st.rerun()  # refresh agar dialog tertutup
+
+
+def tampilkan_riwayat(df_riwayat):
+    """
+    Timeline satu pelanggan (hasil `riwayat_pelanggan`): grafik Saldo Akhir
+    per periode & tabel detail (periode terbaru di atas).
+    """
+    if df_riwayat.empty:
+        st.info("Riwayat pelanggan tidak ditemukan.")
+        return
+
+    kolom = [col for col in KOLOM_RIWAYAT if col in df_riwayat.columns]
+    data = df_riwayat[kolom].astype({"Bulan Tahun": str, "Segmen": str})
+
+    fig = px.line(
+        data, x="Bulan Tahun", y="Saldo Akhir", color="Segmen",
+        markers=True, title="Saldo Akhir per Periode",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(data.iloc[::-1], use_container_width=True, hide_index=True)
+
+
+@st.dialog("Riwayat Pelanggan", width="large")
+def riwayat_pelanggan_dialog(id_number, bp_name=""):
+    """Dialog riwayat satu pelanggan di seluruh periode (dari tabel top 3, tanggungan AM, dll)."""
+    df = get_database()
+
+    st.markdown(f"#### {bp_name} ({id_number})")
+    tampilkan_riwayat(riwayat_pelanggan(df, id_number))
+
+
+def _pilih_baris(key, halaman, on_pilih):
+    rows = st.session_state[key].selection.rows
+    if rows:
+        on_pilih(halaman.iloc[rows[0]])
+
+
+def tabel_berhalaman(df, key, posisi=None, kunci=(), on_pilih=None):
+    """
+    Tabel yang hanya mengirim satu halaman ke browser, jadi ukuran payload tetap
+    walau datanya puluhan ribu baris. Ada kontrol kolom urut, arah urut,
+    jumlah baris per halaman & lompat ke halaman.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data sumber (tidak disalin; halaman diambil lewat `iloc`).
+        Kolom `BARIS_SHEET` tidak ditampilkan.
+    key : str
+        Prefix key widget, unik per tabel di satu halaman.
+    posisi : np.ndarray, optional
+        Posisi baris yang ditampilkan dalam urutan bawaan (mis. dari
+        `utils.peringkat.urutan_kuadran`); None = semua baris sesuai urutan `df`.
+    kunci : tuple
+        Pilihan filter yang menghasilkan `df`, untuk cache urutan kolom.
+    on_pilih : callable, optional
+        Kalau diisi, baris tabel bisa diklik; dipanggil dengan baris terpilih (Series).
+    """
+    if posisi is None:
+        posisi = np.arange(len(df))
+    kolom_tampil = [col for col in df.columns if col != BARIS_SHEET]
+
+    c1, c2, c3, c4 = st.columns(4)
+    kolom = c1.selectbox("Urutkan berdasarkan", ["(Bawaan)", *kolom_tampil], key=f"{key}_kolom")
+    naik = c2.selectbox("Arah", ["Turun", "Naik"], key=f"{key}_arah", disabled=kolom == "(Bawaan)") == "Naik"
+    ukuran = c3.selectbox("Baris per halaman", UKURAN_HALAMAN, index=1, key=f"{key}_ukuran")
+
+    jumlah_halaman = max(1, math.ceil(len(posisi) / ukuran))
+    # Urutan berganti -> mulai lagi dari halaman pertama
+    if st.session_state.get(f"{key}_urut_terakhir", (kolom, naik)) != (kolom, naik):
+        st.session_state[f"{key}_halaman"] = 1
+    st.session_state[f"{key}_urut_terakhir"] = (kolom, naik)
+    # Jaga nomor halaman tetap sah setelah filter / ukuran halaman berubah
+    if st.session_state.get(f"{key}_halaman", 1) > jumlah_halaman:
+        st.session_state[f"{key}_halaman"] = jumlah_halaman
+    halaman_ke = c4.number_input(
+        f"Halaman (dari {jumlah_halaman})", min_value=1, max_value=jumlah_halaman, step=1, key=f"{key}_halaman"
+    )
+
+    if kolom != "(Bawaan)":
+        posisi = urutan_kolom(df, posisi, kolom, naik, (*kunci, key))
+
+    awal = (halaman_ke - 1) * ukuran
+    halaman = df.iloc[posisi[awal:awal + ukuran]][kolom_tampil]
+
+    opsi = {}
+    if on_pilih is not None:
+        key_tabel = f"{key}_tabel_{kolom}_{naik}_{ukuran}_{halaman_ke}"
+        opsi = dict(
+            on_select=partial(_pilih_baris, key_tabel, halaman, on_pilih),
+            selection_mode="single-row",
+            key=key_tabel,
+        )
+    st.dataframe(halaman, use_container_width=True, hide_index=True, **opsi)
+    st.caption(f"Baris {min(awal + 1, len(posisi))}-{min(awal + ukuran, len(posisi))} dari {len(posisi)}")
+
@@ -1,52 +1,6 @@
 import streamlit as st
 import pandas as pd
-
-
-def to_number(series: pd.Series, allow_parentheses: bool = False) -> pd.Series:
-    s = series.astype(str).str.strip()
-    if allow_parentheses:
-        # (123) -> -123 untuk kolom aging
-        s = s.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
-    # Bersihkan Rupiah & pemisah ribuan gaya Indonesia
-    s = (
-        s.str.replace("Rp", "", regex=False)
-         .str.replace(".", "", regex=False)     # hapus titik ribuan
-         .str.replace(",", ".", regex=False)    # koma -> titik desimal
-         .str.replace(r"[^\d\.\-]", "", regex=True)  # buang karakter lain
-    )
-    return pd.to_numeric(s, errors="coerce")
-
-def cast_numeric_cols(df):
-    """
-    Konversi semua kolom numerik (kecuali kolom teks) menjadi float.
-    Bersihkan format: hapus .00/,00 di akhir, hapus Rp, titik, koma, spasi.
-    """
-    exclude = ["BP Name", "AM", "Keterangan", "Segmen", "Bulan Tahun", "Last Update"]
-
-    for col in df.columns:
-        if col in exclude:
-            continue  # skip kolom teks
-
-        # pastikan kolom jadi string
-        s = df[col].fillna("").astype(str).str.strip()
-        print(s)
-        
-        # 1️⃣ Hapus kurung
-        s = s.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
-        print(s)
-
-        # 2️⃣ Hapus desimal .00 atau ,00 di akhir
-        s = s.str.replace(r"[.,]00$", "", regex=True)
-        print(s)
-
-        # 3️⃣ Hapus Rp, titik, koma, spasi
-        s = s.str.replace(r"[Rp\s\.,]", "", regex=True)
-        print(s)
-
-        # Konversi ke float
-        df[col] = pd.to_numeric(s, downcast="signed", errors="coerce")
-
-    return df
+from utils.format import cast_to_number
 
 
 def validasi_data(df_upload, tanggal_target, segmen_target):
@@ -81,7 +35,7 @@ def validasi_data(df_upload, tanggal_target, segmen_target):
         st.stop()
 
     # Cast otomatis ke numerik (kecuali kolom teks)
-    df_upload = cast_numeric_cols(df_upload)
+    df_upload = cast_to_number(df_upload)
 
     # Tambahkan kolom tambahan
     if segmen_target != "--Semua--":